@@ -1,7 +1,42 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from utils.llm_client import MistralClient
 from utils.state_manager import StateManager
+from utils.profiler import profiler
+from utils.response_models import FeedbackReport, FeedbackDraft, FinalVerdict
+from config import Config
 import json
+import threading
+
+
+DRAFT_RESPONSE_FORMAT = {
+    "hard_skills": {
+        "topics_covered": "list of strings",
+        "confirmed_skills": "list of strings",
+        "knowledge_gaps": "list of objects"
+    },
+    "soft_skills": {
+        "clarity": "string",
+        "honesty": "string",
+        "engagement": "string",
+        "summary": "string"
+    },
+    "roadmap": {
+        "next_steps": "list of strings",
+        "recommended_topics": "list of strings",
+        "timeline": "string"
+    },
+    "observations": "string"
+}
+
+FINAL_RESPONSE_FORMAT = {
+    "verdict": {
+        "grade": "string",
+        "hiring_recommendation": "string",
+        "confidence_score": "integer",
+        "summary": "string"
+    },
+    "detailed_feedback": "string"
+}
 
 
 class EvaluatorAgent:
@@ -9,6 +44,11 @@ class EvaluatorAgent:
         self.llm_client = llm_client
         self.state_manager = state_manager
 
+        self.draft: Optional[Dict[str, Any]] = None
+        self.draft_turns = 0
+        self._draft_running = False
+        self._draft_lock = threading.Lock()
+
     def generate_final_feedback(self) -> Dict[str, Any]:
         system_prompt = """Ты - старший технический специалист, который анализирует результаты интервью.
 
@@ -58,13 +98,13 @@ class EvaluatorAgent:
         if not self.state_manager or not self.state_manager.state:
             return self._create_default_feedback()
 
-        full_history = ""
-        if self.state_manager.state.conversation_history:
-            for i, turn in enumerate(self.state_manager.state.conversation_history, 1):
-                full_history += f"Ход {i}:\n"
-                full_history += f"Вопрос: {turn.get('agent', '')}\n"
-                full_history += f"Ответ: {turn.get('user', '')}\n"
-                full_history += f"Мысли: {turn.get('internal_thoughts', '')}\n\n"
+        with self._draft_lock:
+            draft, draft_turns = self.draft, self.draft_turns
+        if Config.INCREMENTAL_EVALUATION and draft is not None:
+            return self._finalize_draft(draft, draft_turns)
+
+        prompt_stage = profiler.begin("prompt.evaluator")
+        full_history = self._format_turns(self.state_manager.get_history())
 
         state_summary = self.state_manager.get_state_summary()
 
@@ -86,6 +126,8 @@ class EvaluatorAgent:
 Сформируй финальный отчет."""}
         ]
 
+        profiler.end(prompt_stage)
+
         try:
             response = self.llm_client.generate_structured_response(
                 "evaluator",
@@ -114,11 +156,11 @@ class EvaluatorAgent:
                         "timeline": "string"
                     },
                     "detailed_feedback": "string"
-                }
+                },
+                response_model=FeedbackReport
             )
 
-
-            if not response:
+            if "verdict" not in response:
                 return self._create_default_feedback()
 
             return response
@@ -127,7 +169,141 @@ class EvaluatorAgent:
             print(f"Ошибка генерации фидбэка: {e}")
             return self._create_default_feedback()
 
+    def _format_turns(self, turns: List[Dict[str, str]], first: int = 1) -> str:
+        text = ""
+        for i, turn in enumerate(turns, first):
+            text += f"Ход {i}:\n"
+            text += f"Вопрос: {turn.get('agent', '')}\n"
+            text += f"Ответ: {turn.get('user', '')}\n"
+            text += f"Мысли: {turn.get('internal_thoughts', '')}\n\n"
+        return text
+
+    def _candidate_info(self) -> str:
+        state = self.state_manager.state
+        return f"""Информация о кандидате:
+Имя: {state.participant_name}
+Позиция: {state.position}
+Грейд: {state.grade}
+Опыт: {state.experience}"""
+
+    def draft_due(self) -> bool:
+        state = self.state_manager.state
+        if not Config.INCREMENTAL_EVALUATION or not state:
+            return False
+        with self._draft_lock:
+            return not self._draft_running and \
+                state.question_count - self.draft_turns >= Config.EVALUATOR_DRAFT_EVERY
+
+    def update_draft(self) -> None:
+        """Merges the turns since the last draft into the running evaluation draft.
+
+        Runs in the background between turns, so at the end of the interview
+        only the verdict and the detailed feedback are left to generate.
+        """
+        with self._draft_lock:
+            if self._draft_running:
+                return
+            self._draft_running = True
+            draft, draft_turns = self.draft, self.draft_turns
+
+        try:
+            system_prompt = """Ты - старший технический специалист, который ведет черновик оценки кандидата по ходу интервью.
+
+Тебе даны текущий черновик, статистика интервью и новые ходы диалога. Обнови черновик:
+1. Добавь новые подтвержденные навыки и пробелы в знаниях (с правильными ответами)
+2. Уточни оценку soft skills и roadmap
+3. Не удаляй выводы из черновика без причины
+4. Вердикт не выноси, в observations кратко запиши наблюдения для итогового фидбэка"""
+
+            prompt_stage = profiler.begin("prompt.evaluator_draft")
+            turns_covered = self.state_manager.state.question_count
+            new_turns = self.state_manager.get_history(last=turns_covered - draft_turns)
+            messages = [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": f"""
+{self._candidate_info()}
+
+Статистика интервью:
+{json.dumps(self.state_manager.get_state_summary(), ensure_ascii=False, indent=2)}
+
+Текущий черновик:
+{json.dumps(draft, ensure_ascii=False, indent=2) if draft else "пока нет"}
+
+Новые ходы диалога:
+{self._format_turns(new_turns, turns_covered - len(new_turns) + 1)}
+
+Обнови черновик."""}
+            ]
+            profiler.end(prompt_stage)
+
+            response = self.llm_client.generate_structured_response(
+                "evaluator_draft", messages,
+                response_format=DRAFT_RESPONSE_FORMAT,
+                response_model=FeedbackDraft)
+
+            if "hard_skills" in response:
+                with self._draft_lock:
+                    self.draft = response
+                    self.draft_turns = turns_covered
+        except Exception as e:
+            print(f"Ошибка обновления черновика оценки: {e}")
+        finally:
+            with self._draft_lock:
+                self._draft_running = False
+
+    def _finalize_draft(self, draft: Dict[str, Any], draft_turns: int) -> Dict[str, Any]:
+        state = self.state_manager.state
+        system_prompt = """Ты - старший технический специалист, который завершает оценку интервью.
+
+Анализ hard skills, soft skills и roadmap уже собран в черновике по ходу интервью.
+Учитывая черновик, статистику и последние ходы диалога, вынеси вердикт и напиши подробный фидбэк для кандидата."""
+
+        prompt_stage = profiler.begin("prompt.evaluator")
+        new_turns = self.state_manager.get_history(last=state.question_count - draft_turns) \
+            if state.question_count > draft_turns else []
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"""
+{self._candidate_info()}
+
+Статистика интервью:
+{json.dumps(self.state_manager.get_state_summary(), ensure_ascii=False, indent=2)}
+
+Черновик оценки:
+{json.dumps(draft, ensure_ascii=False, indent=2)}
+
+Ходы после черновика:
+{self._format_turns(new_turns, draft_turns + 1) or "нет"}
+
+Вынеси вердикт и напиши подробный фидбэк."""}
+        ]
+        profiler.end(prompt_stage)
+
+        hard_skills = dict(draft["hard_skills"])
+        for key, signals in (("topics_covered", state.topics_covered),
+                             ("confirmed_skills", state.confirmed_skills)):
+            hard_skills[key] = hard_skills[key] + [item for item in signals if item not in hard_skills[key]]
+        report = {"hard_skills": hard_skills, "soft_skills": draft["soft_skills"], "roadmap": draft["roadmap"]}
+
+        try:
+            response = self.llm_client.generate_structured_response(
+                "evaluator", messages,
+                response_format=FINAL_RESPONSE_FORMAT,
+                response_model=FinalVerdict)
+        except Exception as e:
+            print(f"Ошибка генерации фидбэка: {e}")
+            response = {}
+
+        if "verdict" not in response:
+            return dict(self._create_default_feedback(), **report)
+
+        return dict(report, verdict=response["verdict"], detailed_feedback=response["detailed_feedback"])
+
     def _create_default_feedback(self) -> Dict[str, Any]:
+        summary = self.state_manager.get_state_summary() if self.state_manager else {}
+        if summary.get("question_count", 0) >= Config.MIN_QUESTIONS:
+            return self._create_feedback_from_state(summary)
+
         return {
             "verdict": {
                 "grade": "Junior",
@@ -158,4 +334,61 @@ class EvaluatorAgent:
                 "timeline": "1-2 месяца подготовки"
             },
             "detailed_feedback": "Кандидат рано завершил интервью, что не позволило провести полноценную оценку. Рекомендуется подготовиться и пройти полное интервью."
-        }
\ No newline at end of file
+        }
+
+    def _create_feedback_from_state(self, summary: Dict[str, Any]) -> Dict[str, Any]:
+        avg_confidence = round(summary["avg_confidence"])
+        ability = summary["ability_estimate"]["overall"]["ability"]
+        topics = summary["ability_estimate"]["topics"]
+        gaps = summary["knowledge_gaps"]
+        skills = summary["confirmed_skills"]
+
+        if ability >= 0.5:
+            grade = "Senior"
+        elif ability >= -0.35:
+            grade = "Middle"
+        else:
+            grade = "Junior"
+
+        if avg_confidence >= 80:
+            recommendation = "Strong Hire"
+        elif avg_confidence >= 60:
+            recommendation = "Hire"
+        else:
+            recommendation = "No Hire"
+
+        weakest_topics = sorted(topics, key=lambda topic: topics[topic]["ability"])[:3]
+
+        return {
+            "verdict": {
+                "grade": grade,
+                "hiring_recommendation": recommendation,
+                "confidence_score": avg_confidence,
+                "summary": f"Отчет составлен по статистике интервью ({summary['question_count']} вопросов, "
+                           f"средняя уверенность {avg_confidence}/100)."
+            },
+            "hard_skills": {
+                "topics_covered": summary["topics_covered"],
+                "confirmed_skills": skills,
+                "knowledge_gaps": [
+                    {"topic": "", "gap": gap, "correct_answer": "Рекомендуется разобрать тему подробнее"}
+                    for gap in gaps
+                ]
+            },
+            "soft_skills": {
+                "clarity": "N/A",
+                "honesty": "N/A",
+                "engagement": "N/A",
+                "summary": "Оценка soft skills недоступна: подробный анализ не был сформирован"
+            },
+            "roadmap": {
+                "next_steps": [f"Закрыть пробел: {gap}" for gap in gaps[:3]] or ["Углубить подтвержденные навыки"],
+                "recommended_topics": weakest_topics or summary["topics_covered"][:3],
+                "timeline": "1-2 месяца подготовки"
+            },
+            "detailed_feedback": (
+                f"Интервью пройдено полностью: {summary['question_count']} вопросов. "
+                f"Подтвержденные навыки: {', '.join(skills) or 'не выделены'}. "
+                f"Пробелы в знаниях: {', '.join(gaps) or 'не выявлены'}."
+            )
+        }
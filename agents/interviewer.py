@@ -1,13 +1,62 @@
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Optional, Tuple
 from utils.llm_client import MistralClient
 from utils.state_manager import StateManager
+from utils.profiler import profiler
+from utils.response_models import InterviewerMessage
 import json
+import threading
+
+
+FALLBACK_QUESTIONS = {
+    "easy": [
+        ("Какие типы данных ты чаще всего используешь в работе и чем они отличаются?", "Типы данных",
+         ["изменяемые и неизменяемые типы", "коллекции", "строки и числа"]),
+        ("Как ты обычно ищешь и исправляешь ошибки в своем коде?", "Отладка",
+         ["отладчик", "логирование", "воспроизведение ошибки", "тесты"]),
+        ("Что такое система контроля версий и как ты ей пользуешься?", "Контроль версий",
+         ["коммиты", "ветки", "слияние", "конфликты"]),
+    ],
+    "medium": [
+        ("Расскажи, как ты проектируешь структуру нового модуля или сервиса.", "Проектирование модулей",
+         ["разделение ответственности", "интерфейсы", "зависимости", "тестируемость"]),
+        ("Как ты подходишь к написанию тестов? Какие виды тестов используешь?", "Тестирование",
+         ["модульные тесты", "интеграционные тесты", "моки", "покрытие"]),
+        ("Чем отличаются процессы и потоки, и когда что стоит применять?", "Процессы и потоки",
+         ["общая память", "изоляция процессов", "переключение контекста", "блокировки"]),
+    ],
+    "hard": [
+        ("Как бы ты искал причину деградации производительности в продакшене?", "Производительность",
+         ["метрики", "профилирование", "трассировка запросов", "узкое место"]),
+        ("Как обеспечить согласованность данных между несколькими сервисами?", "Согласованность данных",
+         ["транзакции", "саги", "идемпотентность", "итоговая согласованность"]),
+        ("Расскажи о самом сложном архитектурном решении, которое ты принимал, и его компромиссах.", "Архитектура",
+         ["требования", "альтернативы", "компромиссы", "последствия"]),
+    ]
+}
 
 
 class InterviewerAgent:
     def __init__(self, llm_client: MistralClient, state_manager: StateManager):
         self.llm_client = llm_client
         self.state_manager = state_manager
+        self.fallback_asked: List[str] = []
+        self._generation = 0
+        self._generation_lock = threading.Lock()
+
+    def next_generation(self) -> int:
+        """Starts a new question generation; results of older calls are no longer applied to state."""
+        with self._generation_lock:
+            self._generation += 1
+            return self._generation
+
+    def _apply_question(self, generation: Optional[int], topic: str, key_concepts: List[str]) -> bool:
+        with self._generation_lock:
+            if generation is not None and generation != self._generation:
+                return False
+            self.state_manager.set_expected_concepts(key_concepts)
+            if topic:
+                self.state_manager.add_topic(topic)
+            return True
 
     def generate_initial_question(self) -> Tuple[str, str]:
         state = self.state_manager.state
@@ -25,7 +74,8 @@ class InterviewerAgent:
 Формат ответа:
 {
     "visible_message": "Твое сообщение кандидату",
-    "internal_thought": "Твои мысли о том, почему задал этот вопрос"
+    "internal_thought": "Твои мысли о том, почему задал этот вопрос",
+    "key_concepts": ["Ключевые понятия, которые должны прозвучать в хорошем ответе"]
 }"""
 
         messages = [
@@ -45,14 +95,18 @@ class InterviewerAgent:
             messages,
             response_format={
                 "visible_message": "string",
-                "internal_thought": "string"
-            }
+                "internal_thought": "string",
+                "key_concepts": "list of strings"
+            },
+            response_model=InterviewerMessage
         )
+        self._apply_question(None, "", response.get("key_concepts", []))
 
         return response.get("visible_message", "Привет! Расскажи о своем опыте."), \
             response.get("internal_thought", "Начинаю с базового вопроса.")
 
-    def generate_next_question(self, observer_analysis: Dict[str, Any]) -> Tuple[str, str]:
+    def generate_next_question(self, observer_analysis: Dict[str, Any],
+                               generation: int = None) -> Tuple[str, str]:
         state = self.state_manager.state
         if not state:
             return "Расскажи подробнее о своем опыте.", "Ошибка: состояние не инициализировано"
@@ -61,7 +115,7 @@ class InterviewerAgent:
 
 Ты должен:
 1. Учитывать рекомендации наблюдателя
-2. Адаптировать сложность вопроса (если кандидат отвечал хорошо - усложни, если плохо - упрости)
+2. Адаптировать сложность вопроса (ориентируйся на рекомендацию адаптивной модели по теме и сложности)
 3. Не повторять вопросы
 4. Естественно вести диалог
 5. Если кандидат пытается сменить тему - вежливо вернуть к интервью
@@ -71,17 +125,21 @@ class InterviewerAgent:
 {
     "visible_message": "Твое сообщение кандидату",
     "internal_thought": "Твои мысли о выборе вопроса",
-    "topic": "Тема вопроса"
+    "topic": "Тема вопроса",
+    "key_concepts": ["Ключевые понятия, которые должны прозвучать в хорошем ответе"]
 }"""
 
+        prompt_stage = profiler.begin("prompt.interviewer")
+        recommendation = self.state_manager.recommend_next_question()
+        recommended_topic = "перейти к новой теме"
+        if recommendation["topic"]:
+            recommended_topic = f"углубиться в тему «{recommendation['topic']}»"
+
         recent_convo = ""
-        if state.conversation_history:
-            recent = state.conversation_history[-3:] if len(
-                state.conversation_history) >= 3 else state.conversation_history
-            for turn in recent:
-                recent_convo += f"Интервьюер: {turn.get('agent', '')}\n"
-                recent_convo += f"Кандидат: {turn.get('user', '')}\n"
-                recent_convo += f"Мысли: {turn.get('internal_thoughts', '')}\n\n"
+        for turn in self.state_manager.get_history(last=3):
+            recent_convo += f"Интервьюер: {turn.get('agent', '')}\n"
+            recent_convo += f"Кандидат: {turn.get('user', '')}\n"
+            recent_convo += f"Мысли: {turn.get('internal_thoughts', '')}\n\n"
 
         messages = [
             {"role": "system", "content": system_prompt},
@@ -93,6 +151,7 @@ class InterviewerAgent:
 
 Текущий уровень сложности: {state.difficulty_level}
 Пройденные темы: {', '.join(state.topics_covered)}
+Рекомендация адаптивной модели: {recommended_topic}, сложность {recommendation['difficulty']}
 
 Анализ наблюдателя:
 {json.dumps(observer_analysis, ensure_ascii=False, indent=2)}
@@ -102,6 +161,7 @@ class InterviewerAgent:
 
 Сгенерируй следующий вопрос."""}
         ]
+        profiler.end(prompt_stage)
 
         response = self.llm_client.generate_structured_response(
             "interviewer",
@@ -109,18 +169,17 @@ class InterviewerAgent:
             response_format={
                 "visible_message": "string",
                 "internal_thought": "string",
-                "topic": "string"
-            }
+                "topic": "string",
+                "key_concepts": "list of strings"
+            },
+            response_model=InterviewerMessage
         )
-
-        topic = response.get("topic", "Общая тема")
-        if topic:
-            self.state_manager.add_topic(topic)
+        self._apply_question(generation, response.get("topic", "Общая тема"), response.get("key_concepts", []))
 
         return response.get("visible_message", "Расскажи подробнее о своем опыте."), \
             response.get("internal_thought", "Перехожу к следующей теме.")
 
-    def handle_off_topic(self, user_message: str) -> Tuple[str, str]:
+    def handle_off_topic(self, user_message: str, generation: int = None) -> Tuple[str, str]:
         state = self.state_manager.state
         if not state:
             return "Давайте вернемся к техническим вопросам.", "Ошибка: состояние не инициализировано"
@@ -138,7 +197,8 @@ class InterviewerAgent:
 Формат ответа:
 {{
     "visible_message": "Твое сообщение кандидату",
-    "internal_thought": "Твои мысли"
+    "internal_thought": "Твои мысли",
+    "key_concepts": ["Ключевые понятия, которые должны прозвучать в хорошем ответе"]
 }}"""}
         ]
 
@@ -147,9 +207,29 @@ class InterviewerAgent:
             messages,
             response_format={
                 "visible_message": "string",
-                "internal_thought": "string"
-            }
+                "internal_thought": "string",
+                "key_concepts": "list of strings"
+            },
+            response_model=InterviewerMessage
         )
+        self._apply_question(generation, "", response.get("key_concepts", []))
 
         return response.get("visible_message", "Давайте вернемся к техническим вопросам."), \
-            response.get("internal_thought", "Кандидат пытается уйти от темы.")
\ No newline at end of file
+            response.get("internal_thought", "Кандидат пытается уйти от темы.")
+
+    def fallback_question(self) -> Tuple[str, str]:
+        difficulty = self.state_manager.recommend_next_question()["difficulty"]
+
+        candidates = [entry for entry in FALLBACK_QUESTIONS.get(difficulty, FALLBACK_QUESTIONS["medium"])
+                      if entry[0] not in self.fallback_asked]
+        if not candidates:
+            candidates = [entry for entries in FALLBACK_QUESTIONS.values() for entry in entries
+                          if entry[0] not in self.fallback_asked]
+        if not candidates:
+            self._apply_question(None, "", [])
+            return "Расскажи подробнее о своем опыте.", "Банк вопросов исчерпан, использую общий вопрос."
+
+        question, topic, key_concepts = candidates[0]
+        self.fallback_asked.append(question)
+        self._apply_question(None, topic, key_concepts)
+        return question, f"Интервьюер не уложился в срок хода, задан вопрос из банка (сложность {difficulty})."
\ No newline at end of file
@@ -1,15 +1,118 @@
 from typing import Dict, List, Any
 from utils.llm_client import MistralClient
 from utils.state_manager import StateManager
+from utils.profiler import profiler
+from utils.response_models import ObserverAnalysis
+from utils.answer_grader import LocalAnswerGrader, UNCERTAINTY_MARKERS
+from config import Config
 import json
+import random
+import threading
+
+
+OBSERVER_RESPONSE_FORMAT = {
+    "confidence_score": "integer 0-100",
+    "has_errors": "boolean",
+    "has_hallucinations": "boolean",
+    "is_off_topic": "boolean",
+    "recommendation": "string",
+    "next_action": "string",
+    "knowledge_gaps": "list of strings",
+    "confirmed_skills": "list of strings",
+    "claims": "list of strings",
+    "analysis": "string"
+}
 
 
 class ObserverAgent:
-    def __init__(self, llm_client: MistralClient, state_manager: StateManager):
+    def __init__(self, llm_client: MistralClient, state_manager: StateManager,
+                 grader: LocalAnswerGrader = None):
         self.llm_client = llm_client
         self.state_manager = state_manager
+        self.grader = grader or LocalAnswerGrader()
+
+    def analyze_response(self, user_message: str, current_topic: str,
+                         pre_analysis: Dict[str, Any] = None, analyzed_prefix: str = "") -> Dict[str, Any]:
+        turn = len(self.state_manager.turns) + 1 if self.state_manager.turns is not None else 1
+        response = None
+        if Config.LOCAL_GRADER_ENABLED and self.state_manager.state:
+            with profiler.stage("local_grader"):
+                response = self.grader.grade(
+                    user_message, self.state_manager.state.expected_concepts, current_topic)
+
+        if response is None:
+            if pre_analysis is not None and user_message.startswith(analyzed_prefix):
+                delta = user_message[len(analyzed_prefix):].strip()
+                if delta:
+                    response = self._delta_analysis(pre_analysis, delta, current_topic)
+                else:
+                    response = dict(pre_analysis, source="prefix_analysis")
+            else:
+                response = self._llm_analysis(user_message, current_topic, "observer")
+        elif random.random() < Config.LOCAL_GRADER_SHADOW_RATE:
+            threading.Thread(target=self._shadow_check, args=(response, user_message, current_topic),
+                             daemon=True).start()
+
+        self.state_manager.claims.add_claims(response.get("claims", []), current_topic, turn)
+
+        if self.state_manager.state:
+            confidence = response.get("confidence_score", 50)
+            self.state_manager.update_difficulty(confidence, current_topic)
+
+            for gap in response.get("knowledge_gaps", []):
+                self.state_manager.add_knowledge_gap(gap)
+
+            for skill in response.get("confirmed_skills", []):
+                self.state_manager.add_confirmed_skill(skill)
+
+        return response
+
+    def pre_analyze(self, partial_message: str, current_topic: str) -> Dict[str, Any]:
+        return self._llm_analysis(partial_message, current_topic, "observer",
+                                  note="Кандидат еще продолжает отвечать, оцени уже сказанное.")
+
+    def quick_signals(self, partial_message: str) -> Dict[str, Any]:
+        concepts = self.state_manager.state.expected_concepts if self.state_manager.state else []
+        return self.grader.signals(partial_message, concepts)
+
+    def _delta_analysis(self, pre_analysis: Dict[str, Any], delta: str, current_topic: str) -> Dict[str, Any]:
+        system_prompt = """Ты - наблюдатель на техническом интервью. Начало ответа кандидата уже проанализировано.
+Кандидат дополнил ответ. Обнови анализ с учетом продолжения: пересчитай оценку, добавь новые
+пробелы, навыки и утверждения, исправь выводы, которые продолжение опровергает.
+Верни полный обновленный анализ в том же формате."""
+
+        previous = {key: value for key, value in pre_analysis.items() if key != "response"}
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"""
+Текущая тема: {current_topic}
+
+Анализ начала ответа:
+{json.dumps(previous, ensure_ascii=False)}
 
-    def analyze_response(self, user_message: str, current_topic: str) -> Dict[str, Any]:
+Продолжение ответа кандидата: {delta}
+
+Обнови анализ."""}
+        ]
+
+        response = self.llm_client.generate_structured_response(
+            "observer", messages, response_format=OBSERVER_RESPONSE_FORMAT,
+            response_model=ObserverAnalysis)
+        if "confidence_score" not in response:
+            return dict(pre_analysis, source="prefix_analysis")
+
+        response["claims"] = pre_analysis.get("claims", []) + [
+            claim for claim in response.get("claims", []) if claim not in pre_analysis.get("claims", [])
+        ]
+        response["source"] = "delta_analysis"
+        return response
+
+    def _shadow_check(self, local_response: Dict[str, Any], user_message: str, current_topic: str) -> None:
+        llm_response = self._llm_analysis(user_message, current_topic, "observer_shadow")
+        self.grader.record_agreement(local_response, llm_response)
+
+    def _llm_analysis(self, user_message: str, current_topic: str, agent_type: str,
+                      note: str = "") -> Dict[str, Any]:
         system_prompt = """Ты - наблюдатель на техническом интервью. Анализируй ответы кандидата.
 
 Твои задачи:
@@ -19,10 +122,11 @@ class ObserverAgent:
 4. Дать рекомендации интервьюеру для следующего вопроса
 5. Выявить пробелы в знаниях
 6. Отметить подтвержденные навыки
+7. Выписать ключевые фактические утверждения кандидата из ответа (коротко, по одному факту)
 
 Обрати особое внимание на:
 - Технические ошибки
-- Противоречия с ранее сказанным
+- Противоречия с ранее сказанным (сверяйся с ранее сделанными утверждениями кандидата)
 - Попытки уйти от ответа
 - Несуществующие технологии/факты
 
@@ -36,15 +140,21 @@ class ObserverAgent:
     "next_action": "harder_question|easier_question|clarify|change_topic|continue",
     "knowledge_gaps": ["gap1", "gap2"],
     "confirmed_skills": ["skill1", "skill2"],
+    "claims": ["утверждение1", "утверждение2"],
     "analysis": "Подробный анализ ответа"
 }"""
 
+        prompt_stage = profiler.begin("prompt.observer")
         context = ""
-        if self.state_manager.state and self.state_manager.state.conversation_history:
-            recent = self.state_manager.state.conversation_history[-2:]  # Last 2 turns
-            for turn in recent:
-                context += f"Интервьюер: {turn.get('agent', '')}\n"
-                context += f"Кандидат: {turn.get('user', '')}\n\n"
+        for turn in self.state_manager.get_history(last=2):
+            context += f"Интервьюер: {turn.get('agent', '')}\n"
+            context += f"Кандидат: {turn.get('user', '')}\n\n"
+
+        related_claims = self.state_manager.claims.related(
+            f"{current_topic} {user_message}", limit=Config.CLAIM_CONTEXT_LIMIT)
+        claims_context = "\n".join(
+            f"- (ход {claim['turn']}, {claim['topic']}) {claim['claim']}" for claim in related_claims
+        ) or "нет"
 
         messages = [
             {"role": "system", "content": system_prompt},
@@ -56,35 +166,47 @@ class ObserverAgent:
 Контекст диалога:
 {context}
 
+Ранее сделанные утверждения кандидата по связанным темам:
+{claims_context}
+
 Ответ кандидата: {user_message}
 
-Проанализируй ответ."""}
+Проанализируй ответ. {note}"""}
         ]
-
-        response = self.llm_client.generate_structured_response(
-            "observer",
-            messages,
-            response_format={
-                "confidence_score": "integer 0-100",
-                "has_errors": "boolean",
-                "has_hallucinations": "boolean",
-                "is_off_topic": "boolean",
-                "recommendation": "string",
-                "next_action": "string",
-                "knowledge_gaps": "list of strings",
-                "confirmed_skills": "list of strings",
-                "analysis": "string"
-            }
-        )
-
-        if self.state_manager.state:
-            confidence = response.get("confidence_score", 50)
-            self.state_manager.update_difficulty(confidence)
-
-            for gap in response.get("knowledge_gaps", []):
-                self.state_manager.add_knowledge_gap(gap)
-
-            for skill in response.get("confirmed_skills", []):
-                self.state_manager.add_confirmed_skill(skill)
-
-        return response
\ No newline at end of file
+        profiler.end(prompt_stage)
+
+        return self.llm_client.generate_structured_response(
+            agent_type, messages, response_format=OBSERVER_RESPONSE_FORMAT,
+            response_model=ObserverAnalysis)
+
+    def local_analysis(self, user_message: str) -> Dict[str, Any]:
+        state = self.state_manager.state
+        difficulty = state.difficulty_level if state else "medium"
+        prior_confidence = 50
+        if state and state.confidence_scores:
+            prior_confidence = int(sum(state.confidence_scores) / len(state.confidence_scores))
+
+        text = user_message.lower()
+        words = len(text.split())
+
+        if any(marker in text for marker in UNCERTAINTY_MARKERS) or words < 5:
+            confidence = min(prior_confidence, 30)
+            next_action = "easier_question" if difficulty != "easy" else "change_topic"
+        elif words > 40:
+            confidence = max(prior_confidence, 60)
+            next_action = "continue"
+        else:
+            confidence = prior_confidence
+            next_action = "continue"
+
+        return {
+            "confidence_score": confidence,
+            "has_errors": False,
+            "has_hallucinations": False,
+            "is_off_topic": False,
+            "recommendation": f"Локальная оценка: сохранить уровень сложности {difficulty}",
+            "next_action": next_action,
+            "knowledge_gaps": [],
+            "confirmed_skills": [],
+            "analysis": "Наблюдатель не уложился в бюджет хода, использована локальная эвристическая оценка"
+        }
\ No newline at end of file
@@ -6,6 +6,21 @@ load_dotenv()
 
 class Config:
     MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY", "")
+    MISTRAL_API_KEYS = [key.strip() for key in os.getenv("MISTRAL_API_KEYS", "").split(",") if key.strip()] \
+        or ([MISTRAL_API_KEY] if MISTRAL_API_KEY else [])
+
+    KEY_REQUESTS_PER_MINUTE = int(os.getenv("KEY_REQUESTS_PER_MINUTE", "60"))
+    KEY_MODEL_REQUESTS_PER_MINUTE = {}
+    KEY_COOLDOWN_SECONDS = 30.0
+    KEY_ACQUIRE_TIMEOUT = 60.0
+
+    LLM_BACKEND = os.getenv("LLM_BACKEND", "mistral")  # mistral, llama_cpp, fake
+    AGENT_BACKENDS = dict(
+        item.strip().split("=", 1) for item in os.getenv("AGENT_BACKENDS", "").split(",") if "=" in item
+    )  # e.g. observer=llama_cpp,observer_shadow=llama_cpp
+    LOCAL_MODEL_PATH = os.getenv("LOCAL_MODEL_PATH", "")
+    LOCAL_MODEL_CONTEXT = 4096
+    LOCAL_MODEL_THREADS = int(os.getenv("LOCAL_MODEL_THREADS", "4"))
 
     INTERVIEWER_MODEL = "mistral-large-latest"
     OBSERVER_MODEL = "mistral-large-latest"
@@ -14,12 +29,65 @@ class Config:
     MAX_TOKENS = 2000
     TEMPERATURE = 0.7
 
+    HEDGING_ENABLED = os.getenv("HEDGING_ENABLED", "false").lower() == "true"
+    HEDGE_PERCENTILE = 0.9
+    HEDGE_MIN_SAMPLES = 20
+    HEDGE_MAX_EXTRA_RATIO = 0.1
+
+    STRUCTURED_CONTINUATION_ENABLED = os.getenv("STRUCTURED_CONTINUATION_ENABLED", "true").lower() == "true"
+
+    CLAIM_CONTEXT_LIMIT = 5
+
+    LOCAL_GRADER_ENABLED = os.getenv("LOCAL_GRADER_ENABLED", "true").lower() == "true"
+    LOCAL_GRADER_SHADOW_RATE = 0.1
+
     MAX_QUESTIONS = 10
     MIN_QUESTIONS = 5
 
-    LOG_FORMAT = "json"
+    ABILITY_MAX_ANSWERS_PER_TOPIC = 3
+    ABILITY_CONVERGED_VARIANCE = 0.35
+
+    TURN_DEADLINE_SECONDS = float(os.getenv("TURN_DEADLINE_SECONDS", "20"))
+    OBSERVER_BUDGET_SHARE = 0.5
+    TURN_EXECUTOR_WORKERS = 4
+    BACKGROUND_EXECUTOR_WORKERS = 2
+
+    INCREMENTAL_EVALUATION = os.getenv("INCREMENTAL_EVALUATION", "false").lower() == "true"
+    EVALUATOR_DRAFT_EVERY = 3
+
+    STREAM_DEBOUNCE_SECONDS = 1.5
+    STREAM_MIN_NEW_WORDS = 15
+
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # json, archive
+    LOG_ARCHIVE_DIR = os.getenv("LOG_ARCHIVE_DIR", "logs/archive")
+    LOG_SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+    TURN_STORE_MAX_IN_MEMORY = 50
+    TURN_STORE_SPILL_DIR = os.getenv("TURN_STORE_SPILL_DIR", "logs/spill")
+    TURN_STORE_SPILL_MAX_AGE_HOURS = 24
+
+    SCHEDULER_MAX_CONCURRENCY = int(os.getenv("SCHEDULER_MAX_CONCURRENCY", "4"))
+    SCHEDULER_INTERACTIVE_RESERVED = 1
+    SCHEDULER_QUEUE_LIMITS = {
+        "interactive": 64,
+        "final_feedback": 32,
+        "background": 256
+    }
+    AGENT_PRIORITIES = {
+        "interviewer": "interactive",
+        "observer": "interactive",
+        "observer_shadow": "background",
+        "evaluator": "final_feedback",
+        "evaluator_draft": "background"
+    }
+
+    @classmethod
+    def scheduler_concurrency(cls) -> int:
+        return cls.SCHEDULER_MAX_CONCURRENCY * max(len(cls.MISTRAL_API_KEYS), 1)
 
     @classmethod
     def validate(cls):
-        if not cls.MISTRAL_API_KEY:
-            raise ValueError("MISTRAL_API_KEY is not set. Please set it in .env file")
\ No newline at end of file
+        backends = {cls.AGENT_BACKENDS.get(agent, cls.LLM_BACKEND) for agent in cls.AGENT_PRIORITIES}
+        if "mistral" in backends and not cls.MISTRAL_API_KEYS:
+            raise ValueError("MISTRAL_API_KEY (or MISTRAL_API_KEYS) is not set. Please set it in .env file")
+        if "llama_cpp" in backends and not cls.LOCAL_MODEL_PATH:
+            raise ValueError("LOCAL_MODEL_PATH is not set. Please set it in .env file")
\ No newline at end of file
@@ -1,51 +1,107 @@
 from agents.interviewer import InterviewerAgent
 from agents.observer import ObserverAgent
 from agents.evaluator import EvaluatorAgent
-from utils.llm_client import MistralClient
+from utils.scheduler import LLMScheduler, get_shared_scheduler
+from utils.answer_grader import LocalAnswerGrader
+from utils.answer_stream import AnswerStream
+from utils.profiler import profiler
 from utils.state_manager import StateManager
+from utils.turn_store import TurnStore
 from utils.logger import InterviewLogger
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Callable, Tuple
 from config import Config
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from functools import partial
+import atexit
 import json
+import threading
+import time
+import uuid
 
 
 class MultiAgentInterviewCoach:
-    def __init__(self):
+    def __init__(self, scheduler: Optional[LLMScheduler] = None):
         Config.validate()
 
-        self.llm_client = MistralClient()
+        self.scheduler = scheduler or get_shared_scheduler()
+        self.llm_client = self.scheduler.llm_client
+        self.session_id: Optional[str] = None
         self.state_manager = StateManager()
         self.logger = InterviewLogger()
+        self.grader = LocalAnswerGrader()
 
         self.interviewer = None
         self.observer = None
         self.evaluator = None
 
         self.log_data: Optional[Dict[str, Any]] = None
+        self.saved_log_path: Optional[str] = None
         self.is_interview_active = False
         self.turn_count = 0
+        self.answer_stream: Optional[AnswerStream] = None
+
+        self._executor = ThreadPoolExecutor(max_workers=Config.TURN_EXECUTOR_WORKERS)
+        self._background_executor = ThreadPoolExecutor(max_workers=Config.BACKGROUND_EXECUTOR_WORKERS)
+        self._pending_observer: Optional[Future] = None
+        self._pending_interviewer: Optional[Future] = None
+        self._late_observers: List[Tuple[Future, List[str]]] = []
+        self._session_ended = threading.Event()
+        self.turn_latencies = deque(maxlen=1000)
+        self.degradation_counts = Counter()
+        self._metrics_lock = threading.Lock()
+
+        # A finished session keeps its spill file so the log can still be re-saved; it is removed
+        # on reset, on exit, or by the next start if the process never got that far.
+        TurnStore.remove_stale()
+        atexit.register(self._release_turns)
+
+    def _release_turns(self) -> None:
+        self.state_manager.release()
 
     def reset(self):
+        if self.session_id:
+            self.scheduler.release_session(self.session_id)
+        self.session_id = None
+        self.state_manager.release()
         self.state_manager = StateManager()
         self.interviewer = None
         self.observer = None
         self.evaluator = None
         self.log_data = None
+        self.saved_log_path = None
         self.is_interview_active = False
         self.turn_count = 0
+        self._close_answer_stream()
+        self._pending_observer = None
+        self._pending_interviewer = None
+        self._late_observers = []
+        self._session_ended.set()
+        self._session_ended = threading.Event()
 
     def start_interview(self, participant_name: str, position: str,
                         grade: str, experience: str) -> str:
 
-        self.state_manager.initialize_state(participant_name, position, grade, experience)
+        self._close_answer_stream()
+        if self.session_id:
+            self.scheduler.release_session(self.session_id)
+        self.session_id = uuid.uuid4().hex
+        session_client = self.scheduler.client_for(self.session_id)
 
-        self.interviewer = InterviewerAgent(self.llm_client, self.state_manager)
-        self.observer = ObserverAgent(self.llm_client, self.state_manager)
-        self.evaluator = EvaluatorAgent(self.llm_client, self.state_manager)
+        self.state_manager.initialize_state(participant_name, position, grade, experience, self.session_id)
 
-        self.log_data = self.logger.create_log_structure(participant_name)
+        self.interviewer = InterviewerAgent(session_client, self.state_manager)
+        self.observer = ObserverAgent(session_client, self.state_manager, self.grader)
+        self.evaluator = EvaluatorAgent(session_client, self.state_manager)
+
+        self.log_data = self.logger.create_log_structure(participant_name, self.state_manager.turns)
+        self.saved_log_path = None
+        self._session_ended.set()
+        self._session_ended = threading.Event()
+        self._late_observers = []
 
         visible_message, internal_thought = self.interviewer.generate_initial_question()
+        self.state_manager.turns.opening_message = visible_message
 
         self.is_interview_active = True
         self.turn_count = 0
@@ -53,6 +109,40 @@ class MultiAgentInterviewCoach:
         return visible_message
 
     def process_response(self, user_message: str) -> tuple:
+        with profiler.stage("turn_total"):
+            return self._process_response(user_message)
+
+    def begin_answer(self) -> None:
+        self._close_answer_stream()
+        current_topic = self.state_manager.state.current_topic if self.state_manager.state else ""
+        self.answer_stream = AnswerStream(self.observer, current_topic, self._background_executor)
+
+    def add_answer_chunk(self, chunk: str) -> Dict[str, Any]:
+        if not self.is_interview_active:
+            return {}
+        if self.answer_stream is None:
+            self.begin_answer()
+        return self.answer_stream.add_chunk(chunk)
+
+    def finalize_answer(self) -> tuple:
+        stream = self.answer_stream
+        self.answer_stream = None
+        if stream is None:
+            return self.process_response("")
+
+        # Paths that do not use the stream's analysis (end phrase, busy observer) must still stop it.
+        try:
+            with profiler.stage("turn_total"):
+                return self._process_response(stream.text.strip(), stream.finish)
+        finally:
+            stream.close()
+
+    def _close_answer_stream(self) -> None:
+        if self.answer_stream is not None:
+            self.answer_stream.close()
+            self.answer_stream = None
+
+    def _process_response(self, user_message: str, analyze: Callable[[], Dict[str, Any]] = None) -> tuple:
         if not self.is_interview_active:
             return "Интервью не активно. Начните новое интервью.", "", False
 
@@ -67,39 +157,81 @@ class MultiAgentInterviewCoach:
         if self.state_manager.state:
             current_topic = self.state_manager.state.current_topic
 
-        observer_analysis = self.observer.analyze_response(user_message, current_topic)
+        turn_started = time.monotonic()
+        deadline = turn_started + Config.TURN_DEADLINE_SECONDS
+        degradations: List[str] = []
+
+        # A call abandoned at an earlier deadline still holds a worker; rather than queue behind it,
+        # the turn degrades right away, so at most one call per agent is in flight. The full
+        # analysis of this answer is chained after the pending call and applied late.
+        if self._pending_observer is not None and not self._pending_observer.done():
+            observer_analysis = self.observer.local_analysis(user_message)
+            self._record_degradation(degradations, "observer_busy")
+            late_analysis = analyze or partial(self.observer.analyze_response, user_message, current_topic)
+            self._pending_observer = self._chain_after(self._pending_observer, late_analysis)
+            self._track_late_observer(self._pending_observer, degradations)
+        else:
+            if analyze is None:
+                observer_future = self._executor.submit(self.observer.analyze_response, user_message, current_topic)
+            else:
+                observer_future = self._executor.submit(analyze)
+            self._pending_observer = observer_future
+            try:
+                observer_analysis = observer_future.result(
+                    timeout=Config.TURN_DEADLINE_SECONDS * Config.OBSERVER_BUDGET_SHARE)
+            except FutureTimeoutError:
+                observer_analysis = self.observer.local_analysis(user_message)
+                self._record_degradation(degradations, "observer_timeout")
+                self._track_late_observer(observer_future, degradations)
+
+        # The observer update is the last input to the stop rules; checking them here
+        # spares an interviewer call whose question would be discarded.
+        answered = self.state_manager.state.question_count + 1 if self.state_manager.state else 0
+        if answered >= Config.MAX_QUESTIONS or self.state_manager.is_assessment_converged(answered):
+            self.turn_latencies.append(time.monotonic() - turn_started)
+            self.state_manager.add_conversation_turn(
+                "", user_message, observer_analysis.get("analysis", "Анализ ответа"),
+                "Интервью завершено, следующий вопрос не нужен", degradations)
+            return self._end_interview(), "", True
 
-        if observer_analysis.get("is_off_topic", False):
-            visible_message, internal_thought = self.interviewer.handle_off_topic(user_message)
+        generation = self.interviewer.next_generation()
+        if self._pending_interviewer is not None and not self._pending_interviewer.done():
+            visible_message, internal_thought = self.interviewer.fallback_question()
+            self._record_degradation(degradations, "interviewer_busy")
         else:
-            visible_message, internal_thought = self.interviewer.generate_next_question(observer_analysis)
+            if observer_analysis.get("is_off_topic", False):
+                interviewer_future = self._executor.submit(
+                    self.interviewer.handle_off_topic, user_message, generation)
+            else:
+                interviewer_future = self._executor.submit(
+                    self.interviewer.generate_next_question, observer_analysis, generation)
+            self._pending_interviewer = interviewer_future
+            try:
+                visible_message, internal_thought = interviewer_future.result(
+                    timeout=max(deadline - time.monotonic(), 0))
+            except FutureTimeoutError:
+                self.interviewer.next_generation()
+                visible_message, internal_thought = self.interviewer.fallback_question()
+                self._record_degradation(degradations, "interviewer_timeout")
+
+        self.turn_latencies.append(time.monotonic() - turn_started)
 
         observer_thought = observer_analysis.get("analysis", "Анализ ответа")
-        formatted_thoughts = f"[Observer]: {observer_thought}\n[Interviewer]: {internal_thought}"
+        turn = self.state_manager.add_conversation_turn(
+            visible_message, user_message, observer_thought, internal_thought, degradations)
+        formatted_thoughts = turn.internal_thoughts if turn else ""
 
-        if self.log_data:
-            prev_agent_message = ""
-            if self.log_data["turns"]:
-                prev_agent_message = self.log_data["turns"][-1]["agent_visible_message"]
-
-            self.logger.add_turn(
-                self.log_data,
-                self.turn_count,
-                visible_message,
-                user_message,
-                formatted_thoughts
-            )
-
-        if (self.state_manager.state and
-                self.state_manager.state.question_count >= Config.MAX_QUESTIONS):
-            return self._end_interview(), "", True
+        if self.evaluator.draft_due():
+            self._background_executor.submit(self.evaluator.update_draft)
 
         return visible_message, formatted_thoughts, False
 
     def _end_interview(self) -> str:
         self.is_interview_active = False
+        self._await_late_observers()
 
-        feedback_report = self.evaluator.generate_final_feedback()
+        with profiler.stage("final_feedback_total"):
+            feedback_report = self.evaluator.generate_final_feedback()
 
         feedback_text = self._format_feedback(feedback_report)
 
@@ -108,8 +240,12 @@ class MultiAgentInterviewCoach:
 
             filename = f"interview_log_{self.turn_count}.json"
             filepath = self.logger.save_log(self.log_data, filename)
+            self.saved_log_path = filepath
             print(f"\nЛог сохранен в: {filepath}")
 
+        if self.state_manager.turns:
+            self.state_manager.turns.close()
+
         return feedback_text
 
     def _format_feedback(self, feedback_report: Dict[str, Any]) -> str:
@@ -186,10 +322,105 @@ class MultiAgentInterviewCoach:
 
         return "\n".join(lines)
 
+    def _chain_after(self, previous: Future, fn: Callable[[], Dict[str, Any]]) -> Future:
+        """Runs fn on the background executor once previous has finished, without holding a worker meanwhile."""
+        chained: Future = Future()
+
+        def forward(future: Future) -> None:
+            if future.cancelled():
+                chained.cancel()
+            elif future.exception() is not None:
+                chained.set_exception(future.exception())
+            else:
+                chained.set_result(future.result())
+
+        def start(_) -> None:
+            try:
+                self._background_executor.submit(fn).add_done_callback(forward)
+            except RuntimeError as e:
+                chained.set_exception(e)
+
+        previous.add_done_callback(start)
+        return chained
+
+    def _track_late_observer(self, future: Future, degradations: List[str]) -> None:
+        ended = self._session_ended
+        with self._metrics_lock:
+            self._late_observers.append((future, degradations))
+        future.add_done_callback(lambda f: self._on_late_observer(ended, degradations, f))
+
+    def _on_late_observer(self, ended: threading.Event, degradations: List[str], future: Future) -> None:
+        if future.cancelled() or future.exception() is not None:
+            return
+        with self._metrics_lock:
+            if ended.is_set() or "observer_applied_late" in degradations:
+                return
+            degradations.append("observer_applied_late")
+            self.degradation_counts["observer_applied_late"] += 1
+
+    def _await_late_observers(self) -> None:
+        """Gives outstanding late analyses a bounded chance to reach state before the final evaluation.
+
+        Turns whose analysis still has not landed are marked observer_not_applied,
+        so the saved log matches what the evaluation actually saw.
+        """
+        with self._metrics_lock:
+            late = [(future, degradations) for future, degradations in self._late_observers if not future.done()]
+        if late:
+            wait([future for future, _ in late], timeout=Config.TURN_DEADLINE_SECONDS * Config.OBSERVER_BUDGET_SHARE)
+
+        with self._metrics_lock:
+            self._session_ended.set()
+            for future, degradations in late:
+                if not future.done() or future.cancelled() or future.exception() is not None:
+                    event = "observer_not_applied"
+                elif "observer_applied_late" not in degradations:
+                    event = "observer_applied_late"
+                else:
+                    continue
+                degradations.append(event)
+                self.degradation_counts[event] += 1
+            self._late_observers = []
+
+    def _record_degradation(self, degradations: List[str], event: str) -> None:
+        with self._metrics_lock:
+            degradations.append(event)
+            self.degradation_counts[event] += 1
+
+    def get_turn_metrics(self) -> Dict[str, Any]:
+        latencies = sorted(self.turn_latencies)
+
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            return round(latencies[min(int(p * len(latencies)), len(latencies) - 1)], 3)
+
+        return {
+            "turns": len(latencies),
+            "deadline_seconds": Config.TURN_DEADLINE_SECONDS,
+            "p50_seconds": percentile(0.5),
+            "p95_seconds": percentile(0.95),
+            "p99_seconds": percentile(0.99),
+            "degradations": dict(self.degradation_counts)
+        }
+
+    def get_grader_stats(self) -> Dict[str, Any]:
+        return self.grader.get_stats()
+
+    def get_memory_stats(self) -> Dict[str, Any]:
+        return self.state_manager.get_memory_stats()
+
+    def get_scheduler_metrics(self) -> Dict[str, Any]:
+        return self.scheduler.get_metrics()
+
     def save_current_log(self, filename: str = None) -> str:
         if not self.log_data:
             return "Нет данных для сохранения"
 
+        # The archive stores a session once; a finished interview is already there.
+        if self.logger.archive and self.saved_log_path and not self.is_interview_active:
+            return f"Лог сохранен в: {self.saved_log_path}"
+
         filepath = self.logger.save_log(self.log_data, filename)
         return f"Лог сохранен в: {filepath}"
 
@@ -2,7 +2,9 @@
 
 import sys
 import json
+import argparse
 from main import interview_coach
+from utils.profiler import profiler
 from colorama import init, Fore, Style
 
 init(autoreset=True)
@@ -121,7 +123,48 @@ def run_scenario_mode(scenario_file: str):
         traceback.print_exc()
 
 
+def run_batch_mode(scenario_files: list):
+    for scenario_file in scenario_files:
+        interview_coach.reset()
+        run_scenario_mode(scenario_file)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Multi-Agent Interview Coach")
+    parser.add_argument("--scenario", nargs="+", metavar="FILE",
+                        help="Запустить один или несколько сценариев без меню")
+    parser.add_argument("--profile", action="store_true",
+                        help="Замерить время по стадиям и сохранить профиль")
+    parser.add_argument("--profile-dir", default="profile",
+                        help="Каталог для результатов профилирования")
+    parser.add_argument("--cprofile", action="store_true",
+                        help="Дополнительно запустить cProfile (только основной поток)")
+    parser.add_argument("--sample-interval", type=float, default=0.005,
+                        help="Интервал семплирующего профайлера в секундах, 0 - отключить")
+    return parser.parse_args()
+
+
 def main():
+    args = parse_args()
+
+    if args.profile:
+        profiler.start(use_cprofile=args.cprofile, sample_interval=args.sample_interval)
+
+    try:
+        if args.scenario:
+            run_batch_mode(args.scenario)
+        else:
+            run_menu()
+    finally:
+        if args.profile:
+            profiler.stop()
+            output_dir = profiler.write(args.profile_dir)
+            print(Fore.CYAN + "\nПРОФИЛЬ ПО СТАДИЯМ")
+            print(profiler.format_report())
+            print(Fore.GREEN + f"Профиль сохранен в: {output_dir}")
+
+
+def run_menu():
     print(Fore.CYAN + "Выберите режим работы:")
     print(Fore.YELLOW + "1. Интерактивный режим")
     print(Fore.YELLOW + "2. Режим сценария (из файла JSON)")
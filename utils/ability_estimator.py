@@ -0,0 +1,105 @@
+import math
+import threading
+from typing import Dict, Any, List, Optional
+
+
+DIFFICULTY_LEVELS = {"easy": -1.0, "medium": 0.0, "hard": 1.0}
+
+GRADE_PRIORS = {"junior": -0.7, "middle": 0.0, "senior": 0.7}
+
+
+def _probability(theta: float, difficulty: float) -> float:
+    return 1.0 / (1.0 + math.exp(difficulty - theta))
+
+
+class TopicAbility:
+    __slots__ = ("theta", "variance", "answers")
+
+    def __init__(self, theta: float, variance: float):
+        self.theta = theta
+        self.variance = variance
+        self.answers = 0
+
+    def update(self, difficulty: float, outcome: float) -> None:
+        p = _probability(self.theta, difficulty)
+        precision = 1.0 / self.variance + p * (1.0 - p)
+        self.theta += (outcome - p) / precision
+        self.variance = 1.0 / precision
+        self.answers += 1
+
+    def information_gain(self, difficulty: float) -> float:
+        p = _probability(self.theta, difficulty)
+        return 0.5 * math.log(1.0 + self.variance * p * (1.0 - p))
+
+
+class AbilityEstimator:
+    """Per-topic 1PL (Rasch) ability model with a Gaussian posterior.
+
+    Each observer score (0-100) is treated as a graded outcome of a question
+    at the current difficulty and updates the topic and overall ability with
+    a one-step Laplace approximation. The next topic/difficulty is the one
+    with the largest expected reduction in posterior entropy.
+    """
+
+    def __init__(self, grade: str = "", prior_variance: float = 1.0, topic_spread: float = 0.3,
+                 max_answers_per_topic: int = 3):
+        prior = GRADE_PRIORS.get(grade.strip().lower(), 0.0)
+        self.prior_variance = prior_variance
+        self.topic_spread = topic_spread
+        self.max_answers_per_topic = max_answers_per_topic
+        self.overall = TopicAbility(prior, prior_variance)
+        self.topics: Dict[str, TopicAbility] = {}
+        self._lock = threading.Lock()
+
+    def update(self, topic: str, difficulty_level: str, score: float) -> None:
+        difficulty = DIFFICULTY_LEVELS.get(difficulty_level, 0.0)
+        outcome = min(max(score / 100.0, 0.0), 1.0)
+
+        with self._lock:
+            if topic:
+                if topic not in self.topics:
+                    self.topics[topic] = self._new_topic()
+                self.topics[topic].update(difficulty, outcome)
+            self.overall.update(difficulty, outcome)
+
+    def _new_topic(self) -> TopicAbility:
+        return TopicAbility(self.overall.theta, min(self.overall.variance + self.topic_spread, self.prior_variance))
+
+    def best_difficulty(self, topic: str = "") -> str:
+        with self._lock:
+            ability = self.topics.get(topic, self.overall)
+            return max(DIFFICULTY_LEVELS, key=lambda level: ability.information_gain(DIFFICULTY_LEVELS[level]))
+
+    def recommend(self, exclude: List[str] = None) -> Dict[str, Any]:
+        exclude = exclude or []
+        with self._lock:
+            candidates = {"": self._new_topic()}
+            for topic, ability in self.topics.items():
+                if ability.answers < self.max_answers_per_topic and topic not in exclude:
+                    candidates[topic] = ability
+
+            best: Optional[Dict[str, Any]] = None
+            for topic, ability in candidates.items():
+                for level, difficulty in DIFFICULTY_LEVELS.items():
+                    gain = ability.information_gain(difficulty)
+                    if best is None or gain > best["information_gain"]:
+                        best = {"topic": topic, "difficulty": level,
+                                "ability": round(ability.theta, 2), "information_gain": round(gain, 4)}
+            return best
+
+    def is_converged(self, max_variance: float) -> bool:
+        with self._lock:
+            return self.overall.variance <= max_variance
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "overall": {"ability": round(self.overall.theta, 2),
+                            "uncertainty": round(math.sqrt(self.overall.variance), 2)},
+                "topics": {
+                    topic: {"ability": round(ability.theta, 2),
+                            "uncertainty": round(math.sqrt(ability.variance), 2),
+                            "answers": ability.answers}
+                    for topic, ability in self.topics.items()
+                }
+            }
@@ -0,0 +1,135 @@
+import threading
+from typing import Dict, List, Any, Optional
+from utils.claim_store import WORD_RE, extract_terms, stem
+
+
+UNCERTAINTY_MARKERS = ["не знаю", "не помню", "понятия не имею", "затрудняюсь", "не сталкивался", "без понятия"]
+NEGATION_WORDS = {"не", "нет", "ни", "без", "никогда", "нельзя", "невозможно", "невозможны", "невозможен",
+                  "неверно", "неправда", "ошибочно", "отсутствует", "отсутствуют", "миф"}
+HEDGING_MARKERS = ["наверное", "кажется", "возможно", "может быть", "вроде", "не уверен", "примерно", "как-то"]
+
+
+class LocalAnswerGrader:
+    """Grades clear-cut answers locally against the question's key concepts.
+
+    Two cases are graded here, everything else goes to the LLM observer
+    (grade() returns None):
+    - empty answers and a few words of "не знаю" that touch no key concept;
+    - long, unhedged answers that cover most key concepts with no negation or
+      contradiction word next to any of them. These only set the score and
+      next action: keyword matches are never written into confirmed_skills or
+      knowledge_gaps.
+    """
+
+    def __init__(self, max_uncertain_words: int = 6, min_coverage: float = 0.75, min_words: int = 25,
+                 negation_window: int = 3, agreement_margin: int = 20):
+        self.max_uncertain_words = max_uncertain_words
+        self.min_coverage = min_coverage
+        self.min_words = min_words
+        self.negation_window = negation_window
+        self.agreement_margin = agreement_margin
+        self.stats = {"local": 0, "llm": 0, "shadowed": 0, "agreed": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def grade(self, answer: str, key_concepts: List[str], topic: str) -> Optional[Dict[str, Any]]:
+        text = answer.strip().lower()
+        words = len(text.split())
+
+        if not text or (words <= self.max_uncertain_words
+                        and any(marker in text for marker in UNCERTAINTY_MARKERS)
+                        and not self.covered_concepts(text, key_concepts)):
+            self._count("local")
+            return self._analysis(
+                10, ([topic] if topic else []) + key_concepts[:2], [],
+                "easier_question", "Кандидат не знает ответа на вопрос (локальная оценка)")
+
+        if not key_concepts or words < self.min_words or any(marker in text for marker in UNCERTAINTY_MARKERS) \
+                or any(marker in text for marker in HEDGING_MARKERS):
+            self._count("llm")
+            return None
+
+        covered = self.covered_concepts(text, key_concepts)
+        coverage = len(covered) / len(key_concepts)
+        if coverage >= self.min_coverage and not self._negated(text, covered):
+            self._count("local")
+            confidence = int(80 + 20 * (coverage - self.min_coverage) / (1 - self.min_coverage))
+            return self._analysis(
+                confidence, [], [], "harder_question",
+                f"Ответ уверенно покрывает {len(covered)} из {len(key_concepts)} ключевых понятий (локальная оценка)")
+
+        self._count("llm")
+        return None
+
+    def _negated(self, text: str, concepts: List[str]) -> bool:
+        """True if a negation or contradiction word stands within negation_window words of a concept term."""
+        tokens = WORD_RE.findall(text)
+        stems = [stem(token) for token in tokens]
+        concept_terms = set().union(*(extract_terms(concept) for concept in concepts)) if concepts else set()
+        for i, term in enumerate(stems):
+            if term not in concept_terms:
+                continue
+            window = tokens[max(i - self.negation_window, 0):i + self.negation_window + 1]
+            if any(token in NEGATION_WORDS for token in window):
+                return True
+        return False
+
+    @staticmethod
+    def covered_concepts(text: str, key_concepts: List[str]) -> List[str]:
+        answer_terms = extract_terms(text)
+        covered = []
+        for concept in key_concepts:
+            concept_terms = extract_terms(concept)
+            if concept_terms and len(concept_terms & answer_terms) * 2 >= len(concept_terms):
+                covered.append(concept)
+        return covered
+
+    def signals(self, answer: str, key_concepts: List[str]) -> Dict[str, Any]:
+        text = answer.lower()
+        covered = self.covered_concepts(text, key_concepts)
+        return {
+            "words": len(text.split()),
+            "uncertain": any(marker in text for marker in UNCERTAINTY_MARKERS),
+            "hedging": sum(text.count(marker) for marker in HEDGING_MARKERS),
+            "covered_concepts": covered,
+            "missing_concepts": [concept for concept in key_concepts if concept not in covered]
+        }
+
+    def record_agreement(self, local: Dict[str, Any], llm: Dict[str, Any]) -> None:
+        try:
+            llm_confidence = int(llm.get("confidence_score", 50))
+        except (TypeError, ValueError):
+            return
+
+        agreed = abs(local["confidence_score"] - llm_confidence) <= self.agreement_margin
+        with self._lock:
+            self.stats["shadowed"] += 1
+            if agreed:
+                self.stats["agreed"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        total = stats["local"] + stats["llm"]
+        stats["local_rate"] = round(stats["local"] / total, 3) if total else 0.0
+        stats["agreement_rate"] = round(stats["agreed"] / stats["shadowed"], 3) if stats["shadowed"] else None
+        return stats
+
+    @staticmethod
+    def _analysis(confidence: int, gaps: List[str], skills: List[str],
+                  next_action: str, analysis: str) -> Dict[str, Any]:
+        return {
+            "confidence_score": confidence,
+            "has_errors": False,
+            "has_hallucinations": False,
+            "is_off_topic": False,
+            "recommendation": "",
+            "next_action": next_action,
+            "knowledge_gaps": gaps,
+            "confirmed_skills": skills,
+            "analysis": analysis,
+            "source": "local_grader"
+        }
@@ -0,0 +1,115 @@
+import threading
+import time
+from concurrent.futures import Executor, Future
+from typing import Dict, Any, Optional
+from config import Config
+
+
+class AnswerStream:
+    """Collects a candidate's answer chunk by chunk while it is being spoken or typed.
+
+    Every chunk gets cheap local signals. Once the text stops changing for
+    debounce_seconds and has grown by at least min_new_words since the last
+    pre-analysis, the observer analyses the stable prefix in the background.
+    One debounce thread per stream watches the time of the last chunk.
+    On finish only the remaining delta is sent to the observer.
+    """
+
+    def __init__(self, observer, current_topic: str, executor: Executor,
+                 debounce_seconds: float = None, min_new_words: int = None):
+        self.observer = observer
+        self.current_topic = current_topic
+        self.executor = executor
+        self.debounce_seconds = debounce_seconds if debounce_seconds is not None else Config.STREAM_DEBOUNCE_SECONDS
+        self.min_new_words = min_new_words if min_new_words is not None else Config.STREAM_MIN_NEW_WORDS
+
+        self.text = ""
+        self.pre_analysis: Optional[Dict[str, Any]] = None
+        self.analyzed_prefix = ""
+        self.pre_analyses = 0
+
+        self._last_chunk_at = 0.0
+        self._checked_chunk_at = 0.0
+        self._finished = False
+        self._debouncer: Optional[threading.Thread] = None
+        self._pending: Optional[Future] = None
+        self._pending_prefix = ""
+        self._lock = threading.RLock()
+        self._changed = threading.Condition(self._lock)
+
+    def add_chunk(self, chunk: str) -> Dict[str, Any]:
+        with self._lock:
+            self.text += chunk
+            self._last_chunk_at = time.monotonic()
+            if self._debouncer is None:
+                self._debouncer = threading.Thread(target=self._debounce_loop, daemon=True)
+                self._debouncer.start()
+            self._changed.notify()
+            text = self.text
+
+        return self.observer.quick_signals(text)
+
+    def _debounce_loop(self) -> None:
+        with self._lock:
+            while not self._finished:
+                if self._last_chunk_at == self._checked_chunk_at:
+                    self._changed.wait()
+                    continue
+                remaining = self._last_chunk_at + self.debounce_seconds - time.monotonic()
+                if remaining > 0:
+                    self._changed.wait(remaining)
+                    continue
+                self._checked_chunk_at = self._last_chunk_at
+                self._on_stable()
+
+    def _on_stable(self) -> None:
+        with self._lock:
+            prefix = self.text
+            if self._pending and not self._pending.done():
+                return
+            if len(prefix.split()) - len(self.analyzed_prefix.split()) < self.min_new_words:
+                return
+            self._pending = self.executor.submit(self.observer.pre_analyze, prefix, self.current_topic)
+            self._pending_prefix = prefix
+            self._pending.add_done_callback(lambda future: self._store(prefix, future))
+            self.pre_analyses += 1
+
+    def _store(self, prefix: str, future: Future) -> None:
+        if future.cancelled() or future.exception() is not None:
+            return
+        analysis = future.result()
+        if "confidence_score" not in analysis:
+            return
+        with self._lock:
+            if len(prefix) >= len(self.analyzed_prefix):
+                self.pre_analysis = analysis
+                self.analyzed_prefix = prefix
+
+    def close(self) -> None:
+        """Stops the debounce thread and drops a pre-analysis that has not started yet.
+
+        Safe to call more than once and after finish().
+        """
+        with self._lock:
+            self._finished = True
+            self._changed.notify()
+            if self._pending is not None:
+                self._pending.cancel()
+
+    def finish(self) -> Dict[str, Any]:
+        with self._lock:
+            self._finished = True
+            self._changed.notify()
+            pending, pending_prefix = self._pending, self._pending_prefix
+
+        # Waiters on a future are woken before its done-callbacks run, so the
+        # pending result is stored here rather than relying on _store's callback.
+        if pending is not None:
+            self._store(pending_prefix, pending)
+
+        with self._lock:
+            text = self.text.strip()
+            pre_analysis = self.pre_analysis
+            analyzed_prefix = self.analyzed_prefix.strip()
+
+        return self.observer.analyze_response(text, self.current_topic, pre_analysis, analyzed_prefix)
@@ -0,0 +1,78 @@
+import math
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, List, Any, Set
+
+
+WORD_RE = re.compile(r"[a-zA-Zа-яА-ЯёЁ0-9+#]+")
+
+STOP_WORDS = {
+    "это", "что", "как", "для", "или", "так", "все", "его", "она", "они", "оно", "был", "была",
+    "было", "были", "быть", "есть", "мне", "меня", "мой", "моя", "мои", "нет", "уже", "еще",
+    "ещё", "при", "где", "тоже", "только", "очень", "когда", "если", "чтобы", "который",
+    "которая", "которые", "можно", "нужно", "также", "через", "потому", "кандидат",
+    "the", "and", "for", "with", "that", "this", "are", "was", "use", "used"
+}
+
+ENDINGS = sorted([
+    "ами", "ями", "ого", "его", "ему", "ому", "ыми", "ими", "ых", "их", "ой", "ей", "ий", "ый",
+    "ая", "яя", "ое", "ее", "ам", "ям", "ах", "ях", "ов", "ев", "ом", "ем", "ую", "юю",
+    "а", "я", "ы", "и", "е", "о", "у", "ю", "ь", "s"
+], key=len, reverse=True)
+
+
+def stem(word: str) -> str:
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= 4:
+            word = word[:-len(ending)]
+            break
+    return word[:6]
+
+
+def extract_terms(text: str) -> Set[str]:
+    terms = set()
+    for word in WORD_RE.findall(text.lower()):
+        if len(word) < 3 or word in STOP_WORDS:
+            continue
+        terms.add(stem(word))
+    return terms
+
+
+class ClaimStore:
+    """Per-session store of short factual claims made by the candidate.
+
+    Claims are indexed by crudely stemmed keywords (common endings stripped,
+    then cut to 6 characters), so the observer can pull only the claims
+    related to the current answer instead of sending the whole history.
+    """
+
+    def __init__(self):
+        self.claims: List[Dict[str, Any]] = []
+        self.index: Dict[str, Set[int]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def add_claims(self, claims: List[str], topic: str, turn: int) -> None:
+        with self._lock:
+            for claim in claims:
+                if not isinstance(claim, str) or not claim.strip():
+                    continue
+                claim_id = len(self.claims)
+                self.claims.append({"turn": turn, "topic": topic, "claim": claim.strip()})
+                for term in extract_terms(claim) | extract_terms(topic):
+                    self.index[term].add(claim_id)
+
+    def related(self, text: str, limit: int = 5) -> List[Dict[str, Any]]:
+        with self._lock:
+            total = len(self.claims)
+            scores: Dict[int, float] = defaultdict(float)
+            for term in extract_terms(text):
+                postings = self.index.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + total / len(postings))
+                for claim_id in postings:
+                    scores[claim_id] += idf
+
+            best = sorted(scores, key=lambda claim_id: (-scores[claim_id], -claim_id))[:limit]
+            return [self.claims[claim_id] for claim_id in sorted(best)]
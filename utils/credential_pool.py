@@ -0,0 +1,124 @@
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Dict, List, Any
+from mistralai import Mistral
+from config import Config
+
+
+class Credential:
+    def __init__(self, api_key: str, label: str):
+        self.label = label
+        self.client = Mistral(api_key=api_key)
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        self.windows: Dict[str, deque] = defaultdict(deque)
+        self.usage = {"requests": 0, "errors": 0, "rate_limited": 0}
+        self.model_usage: Dict[str, int] = defaultdict(int)
+
+
+class CredentialPool:
+    """Pool of API keys (one client per key) with per-key, per-model rate limits.
+
+    acquire() picks the least-loaded key that is neither cooling down after a
+    429 nor over its requests-per-minute limit for the model, and blocks until
+    one becomes available.
+    """
+
+    def __init__(self, api_keys: List[str] = None, requests_per_minute: int = None,
+                 model_limits: Dict[str, int] = None, cooldown_seconds: float = None):
+        api_keys = api_keys or Config.MISTRAL_API_KEYS
+        self.credentials = [Credential(key, f"key-{i + 1}:...{key[-4:]}") for i, key in enumerate(api_keys)]
+        self.requests_per_minute = requests_per_minute or Config.KEY_REQUESTS_PER_MINUTE
+        self.model_limits = model_limits if model_limits is not None else Config.KEY_MODEL_REQUESTS_PER_MINUTE
+        self.cooldown_seconds = cooldown_seconds or Config.KEY_COOLDOWN_SECONDS
+        self._lock = threading.Condition()
+
+    def __len__(self) -> int:
+        return len(self.credentials)
+
+    def _window_count(self, credential: Credential, model: str, now: float) -> int:
+        window = credential.windows[model]
+        while window and now - window[0] >= 60:
+            window.popleft()
+        return len(window)
+
+    def _next_free_at(self, model: str, now: float) -> float:
+        limit = self.model_limits.get(model, self.requests_per_minute)
+        moments = []
+        for credential in self.credentials:
+            moment = credential.cooldown_until
+            window = credential.windows[model]
+            if len(window) >= limit:
+                moment = max(moment, window[0] + 60)
+            moments.append(moment)
+        return min(moments) if moments else now
+
+    def acquire(self, model: str, timeout: float = None) -> Credential:
+        if timeout is None:
+            timeout = Config.KEY_ACQUIRE_TIMEOUT
+        deadline = time.monotonic() + timeout
+        limit = self.model_limits.get(model, self.requests_per_minute)
+
+        with self._lock:
+            while True:
+                now = time.monotonic()
+                available = [
+                    credential for credential in self.credentials
+                    if credential.cooldown_until <= now and self._window_count(credential, model, now) < limit
+                ]
+                if available:
+                    credential = min(available, key=lambda c: (c.in_flight, len(c.windows[model])))
+                    credential.windows[model].append(now)
+                    credential.in_flight += 1
+                    credential.usage["requests"] += 1
+                    credential.model_usage[model] += 1
+                    return credential
+
+                if now >= deadline:
+                    raise RuntimeError(f"Нет доступных API ключей для модели {model}")
+                self._lock.wait(max(min(self._next_free_at(model, now), deadline) - now, 0.01))
+
+    def release(self, credential: Credential, rate_limited: bool = False, error: bool = False) -> None:
+        with self._lock:
+            credential.in_flight -= 1
+            if error:
+                credential.usage["errors"] += 1
+            if rate_limited:
+                credential.usage["rate_limited"] += 1
+                credential.cooldown_until = time.monotonic() + self.cooldown_seconds
+            self._lock.notify_all()
+
+    def get_usage(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            now = time.monotonic()
+            return [
+                {
+                    "key": credential.label,
+                    "in_flight": credential.in_flight,
+                    "cooling_down": credential.cooldown_until > now,
+                    **credential.usage,
+                    "models": dict(credential.model_usage),
+                    "requests_last_minute": {
+                        model: self._window_count(credential, model, now) for model in list(credential.windows)
+                    }
+                }
+                for credential in self.credentials
+            ]
+
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_shared_pool() -> CredentialPool:
+    """Process-wide pool, so per-key limits and cooldowns hold across all sessions."""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = CredentialPool()
+        return _shared_pool
+
+
+def is_rate_limited(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 429
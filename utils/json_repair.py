@@ -0,0 +1,102 @@
+import json
+import re
+from typing import Dict, Any, Optional, List, Tuple
+
+
+TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+MAX_START_CANDIDATES = 5
+
+
+def _scan(fragment: str) -> Tuple[Optional[int], List[str], bool, bool, List[int]]:
+    """Returns (end of first complete object, open brackets, in string, pending escape, cut points)."""
+    stack: List[str] = []
+    cut_points: List[int] = []
+    in_string = False
+    escaped = False
+
+    for i, ch in enumerate(fragment):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+            cut_points.append(i + 1)
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                return i + 1, stack, False, False, cut_points
+        elif ch == ",":
+            cut_points.append(i)
+
+    return None, stack, in_string, escaped, cut_points
+
+
+def _close(fragment: str) -> str:
+    _, stack, in_string, escaped, _ = _scan(fragment)
+    closed = fragment
+    if in_string:
+        if escaped:
+            closed = closed[:-1]
+        closed += '"'
+    closed = closed.rstrip()
+    if closed.endswith(","):
+        closed = closed[:-1]
+    elif closed.endswith(":"):
+        closed += " null"
+    return closed + "".join(reversed(stack))
+
+
+def _loads(candidate: str) -> Optional[Dict[str, Any]]:
+    for text in (candidate, TRAILING_COMMA_RE.sub(r"\1", candidate)):
+        try:
+            value = json.loads(text)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(value, dict):
+            return value
+    return None
+
+
+def _repair_from(fragment: str) -> Optional[Dict[str, Any]]:
+    end, _, _, _, cut_points = _scan(fragment)
+    if end is not None:
+        return _loads(fragment[:end])
+
+    for cut in [len(fragment)] + sorted(cut_points, reverse=True)[:8]:
+        value = _loads(_close(fragment[:cut]))
+        if value is not None:
+            return value
+    return None
+
+
+def repair_json(text: str) -> Optional[Dict[str, Any]]:
+    """Extracts a JSON object from a model reply, repairing common defects.
+
+    Handles prose or code fences around the object, stray braces before or
+    after it, trailing commas and replies truncated mid-string or mid-object
+    (open strings and brackets are closed, a dangling partial value is cut).
+    """
+    if not text:
+        return None
+
+    fallback = None
+    start = text.find("{")
+    for _ in range(MAX_START_CANDIDATES):
+        if start == -1:
+            break
+        value = _repair_from(text[start:])
+        if value:
+            return value
+        if value is not None and fallback is None:
+            fallback = value
+        start = text.find("{", start + 1)
+    return fallback
@@ -0,0 +1,237 @@
+import json
+import queue
+import threading
+from typing import Dict, List, Any, Iterator
+from config import Config
+from utils.profiler import profiler
+from utils.credential_pool import CredentialPool, get_shared_pool, is_rate_limited
+
+try:
+    from llama_cpp import Llama
+except ImportError:
+    Llama = None
+
+
+class LLMBackend:
+    """Common interface of chat backends used by MistralClient.
+
+    chat() returns the whole reply (json_mode asks the backend for a JSON
+    object where it supports constrained output), stream() yields reply
+    chunks. remote backends go over the network and may be hedged.
+    """
+
+    name = "base"
+    remote = False
+
+    def chat(self, agent_type: str, model: str, messages: List[Dict[str, str]],
+             json_mode: bool = False) -> str:
+        raise NotImplementedError
+
+    def stream(self, agent_type: str, model: str, messages: List[Dict[str, str]]) -> Iterator[str]:
+        yield self.chat(agent_type, model, messages)
+
+
+class MistralBackend(LLMBackend):
+    name = "mistral"
+    remote = True
+
+    def __init__(self, pool: CredentialPool = None):
+        self.pool = pool or get_shared_pool()
+
+    def chat(self, agent_type: str, model: str, messages: List[Dict[str, str]],
+             json_mode: bool = False) -> str:
+        options = {"response_format": {"type": "json_object"}} if json_mode else {}
+        for attempt in range(len(self.pool)):
+            credential = self.pool.acquire(model)
+            try:
+                with profiler.stage(f"network.{agent_type}"):
+                    response = credential.client.chat.complete(
+                        model=model,
+                        messages=messages,
+                        max_tokens=Config.MAX_TOKENS,
+                        temperature=Config.TEMPERATURE,
+                        **options
+                    )
+            except Exception as e:
+                rate_limited = is_rate_limited(e)
+                self.pool.release(credential, rate_limited=rate_limited, error=True)
+                if rate_limited and attempt < len(self.pool) - 1:
+                    continue
+                raise
+
+            self.pool.release(credential)
+            return response.choices[0].message.content
+
+    def stream(self, agent_type: str, model: str, messages: List[Dict[str, str]]) -> Iterator[str]:
+        credential = self.pool.acquire(model)
+        error = None
+        try:
+            for event in credential.client.chat.stream(
+                    model=model,
+                    messages=messages,
+                    max_tokens=Config.MAX_TOKENS,
+                    temperature=Config.TEMPERATURE):
+                delta = event.data.choices[0].delta.content
+                if isinstance(delta, str) and delta:
+                    yield delta
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.pool.release(credential, rate_limited=error is not None and is_rate_limited(error),
+                              error=error is not None)
+
+
+class LlamaCppBackend(LLMBackend):
+    """In-process GGUF model on CPU via llama-cpp-python.
+
+    The model is loaded on first use and shared by all agents mapped to this
+    backend; llama.cpp contexts are not thread-safe, so calls are serialized
+    (one call at a time per loaded model). The scheduler routes local calls
+    through its one-worker local lane, so the lock is not contended and
+    priority decides which call runs next.
+    """
+
+    name = "llama_cpp"
+
+    def __init__(self, model_path: str = None, n_ctx: int = None, n_threads: int = None):
+        if Llama is None:
+            raise RuntimeError("Для локального бэкенда установите llama-cpp-python")
+        self.model_path = model_path or Config.LOCAL_MODEL_PATH
+        if not self.model_path:
+            raise ValueError("LOCAL_MODEL_PATH is not set. Please set it in .env file")
+        self.n_ctx = n_ctx or Config.LOCAL_MODEL_CONTEXT
+        self.n_threads = n_threads or Config.LOCAL_MODEL_THREADS
+        self._llm = None
+        self._lock = threading.Lock()
+
+    def _model(self):
+        if self._llm is None:
+            self._llm = Llama(model_path=self.model_path, n_ctx=self.n_ctx,
+                              n_threads=self.n_threads, verbose=False)
+        return self._llm
+
+    def chat(self, agent_type: str, model: str, messages: List[Dict[str, str]],
+             json_mode: bool = False) -> str:
+        options = {"response_format": {"type": "json_object"}} if json_mode else {}
+        with self._lock, profiler.stage(f"local.{agent_type}"):
+            response = self._model().create_chat_completion(
+                messages=messages,
+                max_tokens=Config.MAX_TOKENS,
+                temperature=Config.TEMPERATURE,
+                **options
+            )
+        return response["choices"][0]["message"]["content"] or ""
+
+    def stream(self, agent_type: str, model: str, messages: List[Dict[str, str]]) -> Iterator[str]:
+        # Generation runs on its own thread so the model lock is never held across a yield:
+        # a consumer that stops reading sets stop and the lock is released at the next token.
+        chunks: queue.Queue = queue.Queue()
+        stop = threading.Event()
+
+        def produce() -> None:
+            try:
+                with self._lock:
+                    for chunk in self._model().create_chat_completion(
+                            messages=messages,
+                            max_tokens=Config.MAX_TOKENS,
+                            temperature=Config.TEMPERATURE,
+                            stream=True):
+                        if stop.is_set():
+                            break
+                        delta = chunk["choices"][0]["delta"].get("content")
+                        if delta:
+                            chunks.put(delta)
+            except Exception as e:
+                chunks.put(e)
+            finally:
+                chunks.put(None)
+
+        threading.Thread(target=produce, daemon=True).start()
+        try:
+            while True:
+                item = chunks.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+
+
+FAKE_REPLIES = {
+    "interviewer": {
+        "visible_message": "Расскажи, как устроен словарь в Python?",
+        "internal_thought": "Проверяю базовые структуры данных.",
+        "topic": "Структуры данных",
+        "key_concepts": ["хеш-таблица", "хешируемые ключи", "коллизии"]
+    },
+    "observer": {
+        "confidence_score": 60,
+        "has_errors": False,
+        "has_hallucinations": False,
+        "is_off_topic": False,
+        "recommendation": "Продолжить по текущей теме",
+        "next_action": "continue",
+        "knowledge_gaps": [],
+        "confirmed_skills": [],
+        "claims": [],
+        "analysis": "Ответ по теме, без явных ошибок."
+    },
+    "evaluator": {
+        "verdict": {
+            "grade": "Middle",
+            "hiring_recommendation": "Hire",
+            "confidence_score": 60,
+            "summary": "Тестовый отчет."
+        },
+        "hard_skills": {"topics_covered": [], "confirmed_skills": [], "knowledge_gaps": []},
+        "soft_skills": {"clarity": "N/A", "honesty": "N/A", "engagement": "N/A", "summary": ""},
+        "roadmap": {"next_steps": [], "recommended_topics": [], "timeline": ""},
+        "detailed_feedback": "Тестовый фидбэк."
+    },
+    "evaluator_draft": {
+        "hard_skills": {"topics_covered": [], "confirmed_skills": [], "knowledge_gaps": []},
+        "observations": "Тестовый черновик."
+    }
+}
+
+
+class FakeBackend(LLMBackend):
+    """Deterministic backend for tests and offline runs.
+
+    Replies come from FAKE_REPLIES (overridable per agent type with a string,
+    a dict or a callable taking the messages) and every call is recorded in
+    calls.
+    """
+
+    name = "fake"
+
+    def __init__(self, replies: Dict[str, Any] = None):
+        self.replies = dict(FAKE_REPLIES, **(replies or {}))
+        self.calls: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def chat(self, agent_type: str, model: str, messages: List[Dict[str, str]],
+             json_mode: bool = False) -> str:
+        with self._lock:
+            self.calls.append({"agent_type": agent_type, "model": model, "messages": list(messages)})
+
+        reply = self.replies.get(agent_type, self.replies.get(agent_type.split("_")[0], ""))
+        if callable(reply):
+            reply = reply(messages)
+        return reply if isinstance(reply, str) else json.dumps(reply, ensure_ascii=False)
+
+
+BACKENDS = {
+    MistralBackend.name: MistralBackend,
+    LlamaCppBackend.name: LlamaCppBackend,
+    FakeBackend.name: FakeBackend
+}
+
+
+def create_backend(name: str) -> LLMBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend '{name}'. Available: {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
@@ -1,48 +1,229 @@
-from mistralai import Mistral
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Type, Iterator
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import json
+import threading
+import time
 from config import Config
+from utils.profiler import profiler
+from utils.llm_backends import LLMBackend, create_backend
+from utils.json_repair import repair_json
+from utils.response_models import ResponseModel, validate_response, merge_fields
+
+
+class LatencyTracker:
+    def __init__(self, window: int = 200):
+        self.samples = defaultdict(lambda: deque(maxlen=window))
+        self._lock = threading.Lock()
+
+    def record(self, key: str, seconds: float) -> None:
+        with self._lock:
+            self.samples[key].append(seconds)
+
+    def percentile(self, key: str, p: float, min_samples: int = 1) -> Optional[float]:
+        with self._lock:
+            values = sorted(self.samples[key])
+        if len(values) < min_samples:
+            return None
+        return values[min(int(p * len(values)), len(values) - 1)]
 
 
 class MistralClient:
-    def __init__(self):
-        self.client = Mistral(api_key=Config.MISTRAL_API_KEY)
+    """Entry point for all agent LLM calls.
+
+    Each agent type is served by the backend named in Config.AGENT_BACKENDS
+    (Config.LLM_BACKEND by default); passing backend uses it for every agent.
+    """
+
+    def __init__(self, backend: LLMBackend = None):
         self.models = {
             "interviewer": Config.INTERVIEWER_MODEL,
             "observer": Config.OBSERVER_MODEL,
-            "evaluator": Config.EVALUATOR_MODEL
+            "observer_shadow": Config.OBSERVER_MODEL,
+            "evaluator": Config.EVALUATOR_MODEL,
+            "evaluator_draft": Config.EVALUATOR_MODEL
         }
 
-    def generate_response(self, agent_type: str, messages: List[Dict[str, str]]) -> str:
+        self.backends: Dict[str, LLMBackend] = {}
+        self.agent_backends: Dict[str, LLMBackend] = {}
+        for agent_type in self.models:
+            name = backend.name if backend else Config.AGENT_BACKENDS.get(agent_type, Config.LLM_BACKEND)
+            if name not in self.backends:
+                self.backends[name] = backend or create_backend(name)
+            self.agent_backends[agent_type] = self.backends[name]
+
+        self.latency = LatencyTracker()
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+        self._hedge_lock = threading.Lock()
+        self.hedge_stats = {"requests": 0, "hedges_sent": 0, "hedge_wins": 0, "primary_wins": 0}
+        self.parse_stats = defaultdict(int)
+
+    def _complete(self, agent_type: str, messages: List[Dict[str, str]], json_mode: bool = False) -> str:
+        model = self.models[agent_type]
+        started = time.monotonic()
+        content = self.agent_backends[agent_type].chat(agent_type, model, messages, json_mode)
+        self.latency.record(f"{agent_type}:{model}", time.monotonic() - started)
+        return content
+
+    def _hedge_allowed(self) -> bool:
+        with self._hedge_lock:
+            requests = self.hedge_stats["requests"]
+            if self.hedge_stats["hedges_sent"] + 1 > requests * Config.HEDGE_MAX_EXTRA_RATIO:
+                return False
+            self.hedge_stats["hedges_sent"] += 1
+            return True
+
+    def _hedged_complete(self, agent_type: str, messages: List[Dict[str, str]], json_mode: bool = False) -> str:
+        with self._hedge_lock:
+            self.hedge_stats["requests"] += 1
+
+        key = f"{agent_type}:{self.models[agent_type]}"
+        threshold = self.latency.percentile(key, Config.HEDGE_PERCENTILE, Config.HEDGE_MIN_SAMPLES)
+        if threshold is None:
+            return self._complete(agent_type, messages, json_mode)
+
+        if self._hedge_executor is None:
+            with self._hedge_lock:
+                if self._hedge_executor is None:
+                    # Every scheduled call may have a primary and a hedge (or a still-running loser)
+                    # in flight, so the pool must not be smaller than twice the scheduler's concurrency.
+                    self._hedge_executor = ThreadPoolExecutor(max_workers=2 * Config.scheduler_concurrency())
+
+        primary = self._hedge_executor.submit(self._complete, agent_type, list(messages), json_mode)
+        done, _ = wait([primary], timeout=threshold)
+        if done or not self._hedge_allowed():
+            return primary.result()
+
+        hedge = self._hedge_executor.submit(self._complete, agent_type, list(messages), json_mode)
+        pending = {primary, hedge}
+        last_error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    last_error = future.exception()
+                    continue
+                for loser in pending:
+                    loser.cancel()
+                with self._hedge_lock:
+                    self.hedge_stats["hedge_wins" if future is hedge else "primary_wins"] += 1
+                return future.result()
+
+        raise last_error
+
+    def generate_response(self, agent_type: str, messages: List[Dict[str, str]],
+                          json_mode: bool = False) -> str:
+        backend = self.agent_backends[agent_type]
         try:
-            response = self.client.chat.complete(
-                model=self.models[agent_type],
-                messages=messages,
-                max_tokens=Config.MAX_TOKENS,
-                temperature=Config.TEMPERATURE
-            )
-            return response.choices[0].message.content
+            if Config.HEDGING_ENABLED and backend.remote:
+                return self._hedged_complete(agent_type, messages, json_mode)
+            return self._complete(agent_type, messages, json_mode)
         except Exception as e:
-            print(f"Error calling Mistral API: {e}")
+            print(f"Error calling LLM backend '{backend.name}': {e}")
             return ""
 
+    def generate_stream(self, agent_type: str, messages: List[Dict[str, str]]) -> Iterator[str]:
+        backend = self.agent_backends[agent_type]
+        key = f"{agent_type}:{self.models[agent_type]}"
+        started = time.monotonic()
+        first_chunk = True
+        try:
+            for chunk in backend.stream(agent_type, self.models[agent_type], messages):
+                if first_chunk:
+                    self.latency.record(f"{key}:first_chunk", time.monotonic() - started)
+                    first_chunk = False
+                yield chunk
+        except Exception as e:
+            print(f"Error calling LLM backend '{backend.name}': {e}")
+            return
+        self.latency.record(f"{key}:stream", time.monotonic() - started)
+
+    def is_remote(self, agent_type: str) -> bool:
+        return self.agent_backends[agent_type].remote
+
+    def get_key_usage(self) -> List[Dict[str, Any]]:
+        backend = self.backends.get("mistral")
+        return backend.pool.get_usage() if backend else []
+
+    def get_hedging_stats(self) -> Dict[str, Any]:
+        with self._hedge_lock:
+            stats = dict(self.hedge_stats)
+
+        decided = stats["hedge_wins"] + stats["primary_wins"]
+        stats["hedge_rate"] = round(stats["hedges_sent"] / stats["requests"], 3) if stats["requests"] else 0.0
+        stats["hedge_win_rate"] = round(stats["hedge_wins"] / decided, 3) if decided else 0.0
+        stats["thresholds"] = {
+            key: self.latency.percentile(key, Config.HEDGE_PERCENTILE, Config.HEDGE_MIN_SAMPLES)
+            for key in list(self.latency.samples)
+        }
+        return stats
+
+    def get_parse_stats(self) -> Dict[str, int]:
+        with self._hedge_lock:
+            return dict(self.parse_stats)
+
+    def _count(self, outcome: str) -> None:
+        with self._hedge_lock:
+            self.parse_stats[outcome] += 1
+
+    def _complete_missing_fields(self, agent_type: str, messages: List[Dict[str, str]], reply: str,
+                                 data: Dict[str, Any], missing: List[str],
+                                 response_model: Type[ResponseModel]) -> Optional[Dict[str, Any]]:
+        continuation = messages + [
+            {"role": "assistant", "content": reply},
+            {"role": "user", "content": "В ответе не хватает полей: " + ", ".join(missing) +
+                                        ". Верни JSON только с этими полями, без остальных."}
+        ]
+        extra = repair_json(self.generate_response(agent_type, continuation, json_mode=True))
+        if not extra:
+            return None
+        validated, _ = validate_response(response_model, merge_fields(data, extra))
+        return validated
+
     def generate_structured_response(self, agent_type: str, messages: List[Dict[str, str]],
-                                     response_format: Dict[str, Any] = None) -> Dict[str, Any]:
+                                     response_format: Dict[str, Any] = None,
+                                     response_model: Type[ResponseModel] = None) -> Dict[str, Any]:
         if response_format:
             messages.append({
                 "role": "system",
                 "content": f"Respond in JSON format: {json.dumps(response_format)}"
             })
 
-        response = self.generate_response(agent_type, messages)
+        response = self.generate_response(agent_type, messages, json_mode=True)
 
-        try:
-            start_idx = response.find('{')
-            end_idx = response.rfind('}') + 1
-            if start_idx != -1 and end_idx > start_idx:
-                json_str = response[start_idx:end_idx]
-                return json.loads(json_str)
-        except:
-            pass
-
-        return {"response": response}
\ No newline at end of file
+        with profiler.stage("json_extraction"):
+            data = repair_json(response)
+        if data is None:
+            self._count("failed")
+            return {"response": response}
+        if response_model is None:
+            return data
+
+        with profiler.stage("response_validation"):
+            validated, missing = validate_response(response_model, data)
+        if validated is not None:
+            self._count("validated")
+            return validated
+
+        if missing and Config.STRUCTURED_CONTINUATION_ENABLED:
+            self._count("continuations")
+            validated = self._complete_missing_fields(
+                agent_type, messages, response, data, missing, response_model)
+            if validated is not None:
+                return validated
+
+        self._count("failed")
+        return {"response": response}
+
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+def get_shared_client() -> MistralClient:
+    """Process-wide client, so backends and latency statistics are shared by all sessions."""
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = MistralClient()
+        return _shared_client
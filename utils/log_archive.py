@@ -0,0 +1,165 @@
+import argparse
+import gzip
+import json
+import threading
+from pathlib import Path
+from typing import Dict, Any, Iterator, Optional
+from config import Config
+
+
+class LogArchive:
+    """Append-only archive of finished interview logs.
+
+    Each interview is stored as an independent gzip member inside a segment
+    file (segment_00001.log.gz, ...). A sidecar JSONL index next to every
+    segment records the byte offset and length of each member, so a single
+    interview can be read by session ID without decompressing the segment.
+    Segments roll over once they exceed segment_max_bytes. Appending a
+    session that is already archived with the same content is a no-op; a
+    changed log is appended again and the index points to the newest copy.
+    """
+
+    def __init__(self, archive_dir: str = None, segment_max_bytes: int = None):
+        self.archive_dir = Path(archive_dir or Config.LOG_ARCHIVE_DIR)
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        self.segment_max_bytes = segment_max_bytes or Config.LOG_SEGMENT_MAX_BYTES
+        self._lock = threading.Lock()
+        self._index: Optional[Dict[str, Dict[str, Any]]] = None
+
+    def _segment_paths(self):
+        return sorted(self.archive_dir.glob("segment_*.log.gz"))
+
+    @staticmethod
+    def _index_path(segment_path: Path) -> Path:
+        return segment_path.with_name(segment_path.name.replace(".log.gz", ".idx.jsonl"))
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        if self._index is None:
+            self._index = {}
+            for segment_path in self._segment_paths():
+                index_path = self._index_path(segment_path)
+                if not index_path.exists():
+                    continue
+                with open(index_path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        entry = json.loads(line)
+                        self._index[entry["session_id"]] = entry
+        return self._index
+
+    def _current_segment(self, incoming: int) -> Path:
+        segments = self._segment_paths()
+        if segments and segments[-1].stat().st_size + incoming <= self.segment_max_bytes:
+            return segments[-1]
+        number = int(segments[-1].name[len("segment_"):-len(".log.gz")]) + 1 if segments else 1
+        return self.archive_dir / f"segment_{number:05d}.log.gz"
+
+    def append(self, log_data: Dict[str, Any], session_id: str = None) -> str:
+        session_id = session_id or log_data.get("session_id")
+        if not session_id:
+            raise ValueError("session_id is required to archive a log")
+
+        payload = gzip.compress(
+            json.dumps(log_data, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8"),
+            mtime=0)
+
+        with self._lock:
+            index = self._load_index()
+            existing = index.get(session_id)
+            if existing is not None and existing["length"] == len(payload) and \
+                    self._read_payload(existing) == payload:
+                return session_id
+            segment_path = self._current_segment(len(payload))
+            with open(segment_path, 'ab') as f:
+                offset = f.tell()
+                f.write(payload)
+
+            entry = {
+                "session_id": session_id,
+                "segment": segment_path.name,
+                "offset": offset,
+                "length": len(payload),
+                "participant_name": log_data.get("participant_name", ""),
+                "timestamp": log_data.get("timestamp", "")
+            }
+            with open(self._index_path(segment_path), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            index[session_id] = entry
+
+        return session_id
+
+    def _read_payload(self, entry: Dict[str, Any]) -> bytes:
+        with open(self.archive_dir / entry["segment"], 'rb') as f:
+            f.seek(entry["offset"])
+            return f.read(entry["length"])
+
+    def _read_entry(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        return json.loads(gzip.decompress(self._read_payload(entry)).decode("utf-8"))
+
+    def read(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._load_index().get(session_id)
+        if entry is None:
+            return None
+        return self._read_entry(entry)
+
+    def list_sessions(self) -> Iterator[Dict[str, Any]]:
+        with self._lock:
+            entries = list(self._load_index().values())
+        return iter(entries)
+
+    def iter_logs(self) -> Iterator[Dict[str, Any]]:
+        with self._lock:
+            entries = sorted(self._load_index().values(), key=lambda e: (e["segment"], e["offset"]))
+        for entry in entries:
+            yield self._read_entry(entry)
+
+    def migrate(self, source_dir: str, delete: bool = False) -> int:
+        migrated = 0
+        for path in sorted(Path(source_dir).glob("*.json")):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    log_data = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Пропущен файл {path}: {e}")
+                continue
+
+            self.append(log_data, log_data.get("session_id") or path.stem)
+            migrated += 1
+            if delete:
+                path.unlink()
+        return migrated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Архив логов интервью")
+    parser.add_argument("--archive-dir", default=None)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser("migrate", help="Перенести logs/*.json в архив")
+    migrate_parser.add_argument("source", nargs="?", default="logs")
+    migrate_parser.add_argument("--delete", action="store_true", help="Удалить исходные файлы")
+
+    subparsers.add_parser("list", help="Показать архивированные интервью")
+
+    show_parser = subparsers.add_parser("show", help="Показать интервью по session ID")
+    show_parser.add_argument("session_id")
+
+    args = parser.parse_args()
+    archive = LogArchive(args.archive_dir)
+
+    if args.command == "migrate":
+        count = archive.migrate(args.source, delete=args.delete)
+        print(f"Перенесено логов: {count}")
+    elif args.command == "list":
+        for entry in archive.list_sessions():
+            print(f"{entry['session_id']}\t{entry['timestamp']}\t{entry['participant_name']}")
+    elif args.command == "show":
+        log_data = archive.read(args.session_id)
+        if log_data is None:
+            print(f"Интервью не найдено: {args.session_id}")
+        else:
+            print(json.dumps(log_data, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
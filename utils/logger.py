@@ -2,36 +2,41 @@ import json
 from typing import Dict, List, Any
 from datetime import datetime
 from pathlib import Path
+from utils.turn_store import TurnStore
+from utils.log_archive import LogArchive
+from config import Config
+from utils.profiler import profiler
 
 
 class InterviewLogger:
-    def __init__(self, output_dir: str = "logs"):
+    def __init__(self, output_dir: str = "logs", log_format: str = None):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
+        self.log_format = log_format or Config.LOG_FORMAT
+        self.archive = LogArchive() if self.log_format == "archive" else None
 
-    def create_log_structure(self, participant_name: str) -> Dict[str, Any]:
+    def create_log_structure(self, participant_name: str, turns: TurnStore = None) -> Dict[str, Any]:
         return {
             "participant_name": participant_name,
             "timestamp": datetime.now().isoformat(),
-            "turns": [],
+            "turns": turns if turns is not None else [],
             "final_feedback": ""
         }
 
-    def add_turn(self, log_data: Dict[str, Any], turn_id: int,
-                 agent_visible_message: str, user_message: str,
-                 internal_thoughts: str) -> None:
-        turn = {
-            "turn_id": turn_id,
-            "agent_visible_message": agent_visible_message,
-            "user_message": user_message,
-            "internal_thoughts": internal_thoughts
-        }
-        log_data["turns"].append(turn)
-
     def add_final_feedback(self, log_data: Dict[str, Any], feedback: str) -> None:
         log_data["final_feedback"] = feedback
 
     def save_log(self, log_data: Dict[str, Any], filename: str = None) -> str:
+        with profiler.stage("log_serialization"):
+            return self._save_log(log_data, filename)
+
+    def _save_log(self, log_data: Dict[str, Any], filename: str = None) -> str:
+        if self.archive:
+            serialized = self.serialize_log(log_data)
+            session_id = serialized.get("session_id") or Path(filename or "").stem or None
+            session_id = self.archive.append(serialized, session_id)
+            return f"{self.archive.archive_dir}#{session_id}"
+
         if filename is None:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             name = log_data["participant_name"].replace(" ", "_")
@@ -40,9 +45,15 @@ class InterviewLogger:
         filepath = self.output_dir / filename
 
         with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(log_data, f, ensure_ascii=False, indent=2, default=str)
+            json.dump(self.serialize_log(log_data), f, ensure_ascii=False, indent=2, default=str)
 
         return str(filepath)
 
+    def serialize_log(self, log_data: Dict[str, Any]) -> Dict[str, Any]:
+        turns = log_data["turns"]
+        if isinstance(turns, TurnStore):
+            log_data = dict(log_data, session_id=turns.session_id, turns=turns.to_dicts())
+        return log_data
+
     def format_internal_thoughts(self, observer_thought: str, interviewer_thought: str) -> str:
         return f"[Observer]: {observer_thought}\n[Interviewer]: {interviewer_thought}"
\ No newline at end of file
@@ -0,0 +1,191 @@
+import cProfile
+import json
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+
+NETWORK_PREFIX = "network."
+
+
+class SamplingProfiler:
+    """Samples the stacks of all threads at a fixed interval for flamegraphs."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def write_collapsed(self, path: Path) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class StageProfiler:
+    """Low-overhead per-stage timers, disabled unless a profiling run is active.
+
+    Stages named "network.*" measure time spent waiting on the LLM provider;
+    everything else is local work. Both wall and thread CPU time are recorded,
+    so network waits and local CPU can be told apart. Stages nest (turn_total
+    contains prompt and serialization stages), so each stage also records its
+    self CPU time, i.e. without nested stages on the same thread.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self._open = threading.local()
+        self._cprofile: Optional[cProfile.Profile] = None
+        self._sampler: Optional[SamplingProfiler] = None
+        self._started: Tuple[float, float] = (0.0, 0.0)
+        self._elapsed: Tuple[float, float] = (0.0, 0.0)
+
+    def start(self, use_cprofile: bool = False, sample_interval: float = None) -> None:
+        self.stages = defaultdict(lambda: {"calls": 0, "wall": 0.0, "cpu": 0.0, "self_cpu": 0.0, "max": 0.0})
+        if use_cprofile:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        if sample_interval:
+            self._sampler = SamplingProfiler(sample_interval)
+            self._sampler.start()
+        self._started = (time.perf_counter(), time.process_time())
+        self.enabled = True
+
+    def stop(self) -> None:
+        self.enabled = False
+        self._elapsed = (time.perf_counter() - self._started[0], time.process_time() - self._started[1])
+        if self._cprofile:
+            self._cprofile.disable()
+        if self._sampler:
+            self._sampler.stop()
+
+    def begin(self, name: str) -> Optional[List]:
+        if not self.enabled:
+            return None
+        # [name, wall start, cpu start, cpu of nested stages]
+        token = [name, time.perf_counter(), time.thread_time(), 0.0]
+        self._stack().append(token)
+        return token
+
+    def end(self, token: Optional[List]) -> None:
+        if token is None:
+            return
+        name, wall_started, cpu_started, nested_cpu = token
+        wall = time.perf_counter() - wall_started
+        cpu = time.thread_time() - cpu_started
+
+        stack = self._stack()
+        for i in range(len(stack) - 1, -1, -1):
+            if stack[i] is token:
+                del stack[i]
+                break
+        if stack:
+            stack[-1][3] += cpu
+
+        with self._lock:
+            stage = self.stages[name]
+            stage["calls"] += 1
+            stage["wall"] += wall
+            stage["cpu"] += cpu
+            stage["self_cpu"] += max(cpu - nested_cpu, 0.0)
+            stage["max"] = max(stage["max"], wall)
+
+    def _stack(self) -> List[List]:
+        stack = getattr(self._open, "stack", None)
+        if stack is None:
+            stack = self._open.stack = []
+        return stack
+
+    @contextmanager
+    def stage(self, name: str):
+        token = self.begin(name)
+        try:
+            yield
+        finally:
+            self.end(token)
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = {
+                name: {
+                    "calls": int(stage["calls"]),
+                    "wall_s": round(stage["wall"], 4),
+                    "cpu_s": round(stage["cpu"], 4),
+                    "self_cpu_s": round(stage["self_cpu"], 4),
+                    "avg_ms": round(stage["wall"] / stage["calls"] * 1000, 2) if stage["calls"] else 0.0,
+                    "max_ms": round(stage["max"] * 1000, 2)
+                }
+                for name, stage in sorted(self.stages.items(), key=lambda item: -item[1]["wall"])
+            }
+
+        network_wall = sum(s["wall_s"] for name, s in stages.items() if name.startswith(NETWORK_PREFIX))
+        local_cpu = sum(s["self_cpu_s"] for name, s in stages.items() if not name.startswith(NETWORK_PREFIX))
+        return {
+            "total_wall_s": round(self._elapsed[0], 4),
+            "total_process_cpu_s": round(self._elapsed[1], 4),
+            "network_wall_s": round(network_wall, 4),
+            "local_stage_cpu_s": round(local_cpu, 4),
+            "stages": stages
+        }
+
+    def write(self, output_dir: str) -> Path:
+        path = Path(output_dir)
+        path.mkdir(parents=True, exist_ok=True)
+
+        with open(path / "stages.json", 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+        if self._cprofile:
+            self._cprofile.dump_stats(str(path / "profile.pstats"))
+        if self._sampler:
+            self._sampler.write_collapsed(path / "profile.collapsed")
+
+        return path
+
+    def format_report(self) -> str:
+        report = self.report()
+        lines = [
+            f"Общее время: {report['total_wall_s']} с, CPU процесса: {report['total_process_cpu_s']} с",
+            f"Ожидание сети: {report['network_wall_s']} с, CPU локальных стадий: {report['local_stage_cpu_s']} с",
+            f"{'Стадия':<32}{'вызовы':>8}{'wall, с':>10}{'cpu, с':>10}{'avg, мс':>10}{'max, мс':>10}"
+        ]
+        for name, stage in report["stages"].items():
+            lines.append(f"{name:<32}{stage['calls']:>8}{stage['wall_s']:>10}{stage['cpu_s']:>10}"
+                         f"{stage['avg_ms']:>10}{stage['max_ms']:>10}")
+        return "\n".join(lines)
+
+
+profiler = StageProfiler()
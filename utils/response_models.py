@@ -0,0 +1,247 @@
+import re
+from typing import Dict, List, Any, Optional, Tuple, Type
+from pydantic import BaseModel, ConfigDict, ValidationError, field_validator
+
+
+def _as_text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, dict):
+        return "; ".join(f"{k}: {v}" for k, v in value.items())
+    if isinstance(value, list):
+        return "; ".join(_as_text(item) for item in value)
+    return str(value)
+
+
+def _as_text_list(value: Any) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [part.strip() for part in re.split(r"[;\n]", value) if part.strip()]
+    if not isinstance(value, list):
+        value = [value]
+    return [_as_text(item) for item in value if _as_text(item)]
+
+
+def _as_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "yes", "да", "1")
+    return bool(value)
+
+
+def _as_score(value: Any) -> int:
+    if isinstance(value, str):
+        match = re.search(r"-?\d+(?:[.,]\d+)?", value)
+        if not match:
+            raise ValueError("score is not a number")
+        value = float(match.group().replace(",", "."))
+    return int(min(max(round(float(value)), 0), 100))
+
+
+class ResponseModel(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+
+class ObserverAnalysis(ResponseModel):
+    confidence_score: int
+    has_errors: bool = False
+    has_hallucinations: bool = False
+    is_off_topic: bool = False
+    recommendation: str = ""
+    next_action: str = "continue"
+    knowledge_gaps: List[str] = []
+    confirmed_skills: List[str] = []
+    claims: List[str] = []
+    analysis: str = "Анализ ответа"
+
+    @field_validator("confidence_score", mode="before")
+    @classmethod
+    def _score(cls, value: Any) -> int:
+        return _as_score(value)
+
+    @field_validator("has_errors", "has_hallucinations", "is_off_topic", mode="before")
+    @classmethod
+    def _bools(cls, value: Any) -> bool:
+        return _as_bool(value)
+
+    @field_validator("recommendation", "next_action", "analysis", mode="before")
+    @classmethod
+    def _texts(cls, value: Any) -> str:
+        return _as_text(value)
+
+    @field_validator("knowledge_gaps", "confirmed_skills", "claims", mode="before")
+    @classmethod
+    def _lists(cls, value: Any) -> List[str]:
+        return _as_text_list(value)
+
+
+class InterviewerMessage(ResponseModel):
+    visible_message: str
+    internal_thought: str = ""
+    topic: str = ""
+    key_concepts: List[str] = []
+
+    @field_validator("visible_message", "internal_thought", "topic", mode="before")
+    @classmethod
+    def _texts(cls, value: Any) -> str:
+        return _as_text(value)
+
+    @field_validator("key_concepts", mode="before")
+    @classmethod
+    def _lists(cls, value: Any) -> List[str]:
+        return _as_text_list(value)
+
+
+class Verdict(ResponseModel):
+    grade: str
+    hiring_recommendation: str
+    confidence_score: int = 50
+    summary: str = ""
+
+    @field_validator("confidence_score", mode="before")
+    @classmethod
+    def _score(cls, value: Any) -> int:
+        return _as_score(value)
+
+    @field_validator("grade", "hiring_recommendation", "summary", mode="before")
+    @classmethod
+    def _texts(cls, value: Any) -> str:
+        return _as_text(value)
+
+
+class KnowledgeGap(ResponseModel):
+    topic: str = ""
+    gap: str = ""
+    correct_answer: str = ""
+
+    @field_validator("topic", "gap", "correct_answer", mode="before")
+    @classmethod
+    def _text(cls, value: Any) -> str:
+        return _as_text(value)
+
+
+class HardSkills(ResponseModel):
+    topics_covered: List[str] = []
+    confirmed_skills: List[str] = []
+    knowledge_gaps: List[KnowledgeGap] = []
+
+    @field_validator("topics_covered", "confirmed_skills", mode="before")
+    @classmethod
+    def _lists(cls, value: Any) -> List[str]:
+        return _as_text_list(value)
+
+    @field_validator("knowledge_gaps", mode="before")
+    @classmethod
+    def _gaps(cls, value: Any) -> List[Any]:
+        if value is None:
+            return []
+        if not isinstance(value, list):
+            value = [value]
+        return [item if isinstance(item, dict) else {"gap": _as_text(item)} for item in value]
+
+
+class SoftSkills(ResponseModel):
+    clarity: str = "N/A"
+    honesty: str = "N/A"
+    engagement: str = "N/A"
+    summary: str = ""
+
+    @field_validator("clarity", "honesty", "engagement", "summary", mode="before")
+    @classmethod
+    def _texts(cls, value: Any) -> str:
+        return _as_text(value)
+
+
+class Roadmap(ResponseModel):
+    next_steps: List[str] = []
+    recommended_topics: List[str] = []
+    timeline: str = ""
+
+    @field_validator("next_steps", "recommended_topics", mode="before")
+    @classmethod
+    def _lists(cls, value: Any) -> List[str]:
+        return _as_text_list(value)
+
+    @field_validator("timeline", mode="before")
+    @classmethod
+    def _texts(cls, value: Any) -> str:
+        return _as_text(value)
+
+
+class FeedbackReport(ResponseModel):
+    verdict: Verdict
+    hard_skills: HardSkills = HardSkills()
+    soft_skills: SoftSkills = SoftSkills()
+    roadmap: Roadmap = Roadmap()
+    detailed_feedback: str
+
+    @field_validator("detailed_feedback", mode="before")
+    @classmethod
+    def _texts(cls, value: Any) -> str:
+        return _as_text(value)
+
+
+class FeedbackDraft(ResponseModel):
+    hard_skills: HardSkills
+    soft_skills: SoftSkills = SoftSkills()
+    roadmap: Roadmap = Roadmap()
+    observations: str = ""
+
+    @field_validator("observations", mode="before")
+    @classmethod
+    def _texts(cls, value: Any) -> str:
+        return _as_text(value)
+
+
+class FinalVerdict(ResponseModel):
+    verdict: Verdict
+    detailed_feedback: str
+
+    @field_validator("detailed_feedback", mode="before")
+    @classmethod
+    def _texts(cls, value: Any) -> str:
+        return _as_text(value)
+
+
+def validate_response(model: Type[ResponseModel],
+                      data: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+    """Validates data against model, dropping invalid optional fields.
+
+    Returns (validated dict, []) on success, or (None, missing required field
+    paths) when required fields are missing or unusable.
+    """
+    data = dict(data)
+    for _ in range(3):
+        try:
+            return model.model_validate(data).model_dump(), []
+        except ValidationError as e:
+            missing = []
+            dropped = False
+            for error in e.errors():
+                path = [str(part) for part in error["loc"] if not isinstance(part, int)]
+                field = model.model_fields.get(path[0]) if path else None
+                if field is not None and not field.is_required() and path[0] in data:
+                    data.pop(path[0])
+                    dropped = True
+                elif path:
+                    missing.append(".".join(path))
+            if missing or not dropped:
+                return None, sorted(set(missing))
+    return None, []
+
+
+def merge_fields(base: Dict[str, Any], extra: Dict[str, Any]) -> Dict[str, Any]:
+    """Merges fields from a continuation reply into the original one.
+
+    Nested objects are merged recursively; dotted keys such as
+    "verdict.grade" are expanded into nested objects first.
+    """
+    merged = dict(base)
+    for key, value in extra.items():
+        if "." in key:
+            head, rest = key.split(".", 1)
+            value, key = {rest: value}, head
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            value = merge_fields(merged[key], value)
+        merged[key] = value
+    return merged
@@ -0,0 +1,275 @@
+import heapq
+import itertools
+import queue
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from config import Config
+from utils.llm_client import get_shared_client
+
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_FINAL_FEEDBACK = "final_feedback"
+PRIORITY_BACKGROUND = "background"
+
+PRIORITY_ORDER = [PRIORITY_INTERACTIVE, PRIORITY_FINAL_FEEDBACK, PRIORITY_BACKGROUND]
+
+
+class SchedulerRejected(Exception):
+    pass
+
+
+class _Job:
+    __slots__ = ("session_id", "priority", "fn", "args", "future", "enqueued_at")
+
+    def __init__(self, session_id: str, priority: str, fn: Callable, args: tuple):
+        self.session_id = session_id
+        self.priority = priority
+        self.fn = fn
+        self.args = args
+        self.future: Future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class LLMScheduler:
+    """Central queue in front of MistralClient shared by all sessions.
+
+    Priority classes are served strictly in PRIORITY_ORDER. Inside a class,
+    sessions share the workers by weighted fair queuing: every job gets a
+    virtual finish tag of max(class virtual time, session's last tag) + cost / weight,
+    and the smallest tag is dispatched first, so one session with a long
+    backlog cannot push other sessions' requests back.
+
+    Calls to local backends go through local_lane, a nested one-worker
+    scheduler: an in-process model runs one call at a time, and the lane keeps
+    the same priority order for it without taking workers sized for API keys.
+    """
+
+    def __init__(self, llm_client, max_concurrency: int = None,
+                 queue_limits: Dict[str, int] = None, interactive_reserved: int = None,
+                 local_lane: bool = True):
+        self.llm_client = llm_client
+        self.max_concurrency = max_concurrency or Config.scheduler_concurrency()
+        self.queue_limits = queue_limits or Config.SCHEDULER_QUEUE_LIMITS
+        if interactive_reserved is None:
+            interactive_reserved = Config.SCHEDULER_INTERACTIVE_RESERVED
+        self.interactive_reserved = min(interactive_reserved, self.max_concurrency - 1)
+
+        self._lock = threading.Condition()
+        self._seq = itertools.count()
+        self._queues: Dict[str, List] = {p: [] for p in PRIORITY_ORDER}
+        self._virtual_time: Dict[str, float] = {p: 0.0 for p in PRIORITY_ORDER}
+        self._session_tags: Dict[str, Dict[str, float]] = {p: {} for p in PRIORITY_ORDER}
+        self._session_weights: Dict[str, float] = {}
+        self._session_depth: Dict[str, int] = defaultdict(int)
+        self._in_flight: Dict[str, int] = {p: 0 for p in PRIORITY_ORDER}
+
+        self._stats = {p: {"submitted": 0, "completed": 0, "rejected": 0, "wait_total": 0.0}
+                       for p in PRIORITY_ORDER}
+
+        self.local_lane: Optional[LLMScheduler] = None
+        if local_lane:
+            self.local_lane = LLMScheduler(llm_client, max_concurrency=1, queue_limits=self.queue_limits,
+                                           interactive_reserved=0, local_lane=False)
+
+        self._workers = []
+        for i in range(self.max_concurrency):
+            worker = threading.Thread(target=self._worker_loop, name=f"llm-scheduler-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def client_for(self, session_id: str, weight: float = 1.0) -> "SessionLLMClient":
+        self.set_session_weight(session_id, weight)
+        return SessionLLMClient(self, session_id)
+
+    def set_session_weight(self, session_id: str, weight: float) -> None:
+        with self._lock:
+            self._session_weights[session_id] = max(weight, 0.01)
+        if self.local_lane:
+            self.local_lane.set_session_weight(session_id, weight)
+
+    def release_session(self, session_id: str) -> None:
+        with self._lock:
+            self._session_weights.pop(session_id, None)
+            for tags in self._session_tags.values():
+                tags.pop(session_id, None)
+        if self.local_lane:
+            self.local_lane.release_session(session_id)
+
+    def lane_for(self, agent_type: str) -> "LLMScheduler":
+        if self.local_lane and not self.llm_client.is_remote(agent_type):
+            return self.local_lane
+        return self
+
+    def priority_for(self, agent_type: str) -> str:
+        return Config.AGENT_PRIORITIES.get(agent_type, PRIORITY_BACKGROUND)
+
+    def submit(self, session_id: str, priority: str, fn: Callable, *args, cost: float = 1.0) -> Future:
+        job = _Job(session_id, priority, fn, args)
+
+        with self._lock:
+            queue = self._queues[priority]
+            if len(queue) >= self.queue_limits.get(priority, 0):
+                self._stats[priority]["rejected"] += 1
+                raise SchedulerRejected(f"Очередь '{priority}' переполнена ({len(queue)} запросов)")
+
+            weight = self._session_weights.get(session_id, 1.0)
+            last_tag = self._session_tags[priority].get(session_id, 0.0)
+            tag = max(self._virtual_time[priority], last_tag) + cost / weight
+            self._session_tags[priority][session_id] = tag
+
+            heapq.heappush(queue, (tag, next(self._seq), job))
+            self._session_depth[session_id] += 1
+            self._stats[priority]["submitted"] += 1
+            self._lock.notify()
+
+        return job.future
+
+    def _next_job(self) -> Optional[_Job]:
+        background_in_flight = sum(self._in_flight[p] for p in PRIORITY_ORDER if p != PRIORITY_INTERACTIVE)
+        background_cap = self.max_concurrency - self.interactive_reserved
+
+        for priority in PRIORITY_ORDER:
+            queue = self._queues[priority]
+            if not queue:
+                continue
+            if priority != PRIORITY_INTERACTIVE and background_in_flight >= background_cap:
+                return None
+
+            tag, _, job = heapq.heappop(queue)
+            self._virtual_time[priority] = tag
+            return job
+
+        return None
+
+    def _worker_loop(self) -> None:
+        while True:
+            with self._lock:
+                job = self._next_job()
+                while job is None:
+                    self._lock.wait()
+                    job = self._next_job()
+
+                self._in_flight[job.priority] += 1
+                self._session_depth[job.session_id] -= 1
+                if self._session_depth[job.session_id] <= 0:
+                    del self._session_depth[job.session_id]
+                self._stats[job.priority]["wait_total"] += time.monotonic() - job.enqueued_at
+
+            if job.future.set_running_or_notify_cancel():
+                try:
+                    job.future.set_result(job.fn(*job.args))
+                except Exception as e:
+                    job.future.set_exception(e)
+
+            with self._lock:
+                self._in_flight[job.priority] -= 1
+                self._stats[job.priority]["completed"] += 1
+                self._lock.notify_all()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            classes = {}
+            for priority in PRIORITY_ORDER:
+                stats = self._stats[priority]
+                started = stats["completed"] + self._in_flight[priority]
+                classes[priority] = {
+                    "queue_depth": len(self._queues[priority]),
+                    "in_flight": self._in_flight[priority],
+                    "submitted": stats["submitted"],
+                    "completed": stats["completed"],
+                    "rejected": stats["rejected"],
+                    "avg_wait_ms": round(stats["wait_total"] / started * 1000, 1) if started else 0.0
+                }
+
+            metrics = {
+                "max_concurrency": self.max_concurrency,
+                "classes": classes,
+                "sessions": dict(self._session_depth)
+            }
+
+        if self.local_lane:
+            metrics["local_lane"] = self.local_lane.get_metrics()
+        return metrics
+
+
+_shared_scheduler = None
+_shared_scheduler_lock = threading.Lock()
+
+
+def get_shared_scheduler() -> LLMScheduler:
+    """Process-wide scheduler; fair queuing and admission control only work when sessions share it."""
+    global _shared_scheduler
+    with _shared_scheduler_lock:
+        if _shared_scheduler is None:
+            _shared_scheduler = LLMScheduler(get_shared_client())
+        return _shared_scheduler
+
+
+class SessionLLMClient:
+    """Drop-in replacement for MistralClient that routes calls through the scheduler."""
+
+    def __init__(self, scheduler: LLMScheduler, session_id: str):
+        self.scheduler = scheduler
+        self.session_id = session_id
+
+    def _submit(self, agent_type: str, fn: Callable, messages: List[Dict[str, str]], *args) -> Future:
+        priority = self.scheduler.priority_for(agent_type)
+        cost = sum(len(m.get("content", "")) for m in messages) / 1000 + 1
+        lane = self.scheduler.lane_for(agent_type)
+        return lane.submit(self.session_id, priority, fn, agent_type, messages, *args, cost=cost)
+
+    def _run(self, agent_type: str, fn: Callable, messages: List[Dict[str, str]], *args):
+        return self._submit(agent_type, fn, messages, *args).result()
+
+    def generate_response(self, agent_type: str, messages: List[Dict[str, str]],
+                          json_mode: bool = False) -> str:
+        try:
+            return self._run(agent_type, self.scheduler.llm_client.generate_response, messages, json_mode)
+        except SchedulerRejected as e:
+            print(f"Запрос отклонен планировщиком: {e}")
+            return ""
+
+    def generate_stream(self, agent_type: str, messages: List[Dict[str, str]]) -> Iterator[str]:
+        llm_client = self.scheduler.llm_client
+
+        # The scheduled job pumps the stream into a queue, so a stream holds
+        # one worker (or the local lane) for the duration of the generation, like a regular call.
+        chunks: queue.Queue = queue.Queue()
+        stop = threading.Event()
+
+        def pump(agent_type: str, messages: List[Dict[str, str]]) -> None:
+            try:
+                for chunk in llm_client.generate_stream(agent_type, messages):
+                    if stop.is_set():
+                        break
+                    chunks.put(chunk)
+            finally:
+                chunks.put(None)
+
+        try:
+            self._submit(agent_type, pump, messages)
+        except SchedulerRejected as e:
+            print(f"Запрос отклонен планировщиком: {e}")
+            return
+
+        try:
+            while True:
+                chunk = chunks.get()
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            stop.set()
+
+    def generate_structured_response(self, agent_type: str, messages: List[Dict[str, str]],
+                                     response_format: Dict[str, Any] = None,
+                                     response_model=None) -> Dict[str, Any]:
+        try:
+            return self._run(agent_type, self.scheduler.llm_client.generate_structured_response,
+                             messages, response_format, response_model)
+        except SchedulerRejected as e:
+            print(f"Запрос отклонен планировщиком: {e}")
+            return {"response": ""}
@@ -1,5 +1,12 @@
 from typing import Dict, List, Any, Optional
 from pydantic import BaseModel
+from utils.ability_estimator import AbilityEstimator
+from utils.claim_store import ClaimStore
+from config import Config
+from utils.profiler import profiler
+from utils.turn_store import Turn, TurnStore
+import sys
+import uuid
 
 
 class InterviewState(BaseModel):
@@ -8,13 +15,12 @@ class InterviewState(BaseModel):
     grade: str
     experience: str
 
-    conversation_history: List[Dict[str, str]] = []
-
     topics_covered: List[str] = []
 
     candidate_answers: List[Dict[str, Any]] = []
 
     current_topic: str = ""
+    expected_concepts: List[str] = []
     difficulty_level: str = "medium"  # easy, medium, hard
     question_count: int = 0
 
@@ -29,45 +35,94 @@ class InterviewState(BaseModel):
 class StateManager:
     def __init__(self):
         self.state: Optional[InterviewState] = None
+        self.claims = ClaimStore()
+        self.turns: Optional[TurnStore] = None
+        self.ability = AbilityEstimator()
 
     def initialize_state(self, participant_name: str, position: str,
-                         grade: str, experience: str) -> InterviewState:
-        self.state = InterviewState(
-            participant_name=participant_name,
-            position=position,
-            grade=grade,
-            experience=experience
-        )
+                         grade: str, experience: str, session_id: str = None) -> InterviewState:
+        self.claims = ClaimStore()
+        self.ability = AbilityEstimator(grade, max_answers_per_topic=Config.ABILITY_MAX_ANSWERS_PER_TOPIC)
+        if self.turns:
+            self.turns.discard()
+        self.turns = TurnStore(session_id or uuid.uuid4().hex)
+        with profiler.stage("state_validation"):
+            self.state = InterviewState(
+                participant_name=participant_name,
+                position=position,
+                grade=grade,
+                experience=experience
+            )
         return self.state
 
     def add_conversation_turn(self, agent_message: str, user_message: str,
-                              internal_thoughts: str) -> None:
-        if self.state:
-            self.state.conversation_history.append({
-                "agent": agent_message,
-                "user": user_message,
-                "internal_thoughts": internal_thoughts
-            })
-            self.state.question_count += 1
-
-    def update_difficulty(self, confidence: int) -> None:
+                              observer_thought: str, interviewer_thought: str,
+                              degradations: List[str] = None) -> Optional[Turn]:
+        if not self.state:
+            return None
+
+        turn = Turn(len(self.turns) + 1, agent_message, user_message,
+                    observer_thought, interviewer_thought, degradations)
+        self.turns.append(turn)
+        self.state.question_count += 1
+        return turn
+
+    def get_history(self, last: int = None) -> List[Dict[str, str]]:
+        if not self.turns:
+            return []
+        return self.turns.history(last)
+
+    def release(self) -> None:
+        if self.turns:
+            self.turns.discard()
+
+    def get_memory_stats(self) -> Dict[str, Any]:
+        if not self.turns:
+            return {}
+
+        stats = self.turns.memory_stats()
+        stats["claims"] = len(self.claims.claims)
+        stats["claims_bytes"] = sum(sys.getsizeof(claim["claim"]) for claim in self.claims.claims)
+        return stats
+
+    def update_difficulty(self, confidence: int, topic: str = None) -> None:
         if not self.state:
             return
 
         self.state.confidence_scores.append(confidence)
 
-        if len(self.state.confidence_scores) > 0:
-            avg_confidence = sum(self.state.confidence_scores) / len(self.state.confidence_scores)
+        if topic is None:
+            topic = self.state.current_topic
+        self.ability.update(topic, self.state.difficulty_level, confidence)
+        self.state.difficulty_level = self.ability.best_difficulty(topic)
 
-            if avg_confidence > 80:
-                self.state.difficulty_level = "hard"
-            elif avg_confidence < 40:
-                self.state.difficulty_level = "easy"
-            else:
-                self.state.difficulty_level = "medium"
+    def recommend_next_question(self) -> Dict[str, Any]:
+        if not self.state:
+            return {"topic": "", "difficulty": "medium"}
+
+        recommendation = self.ability.recommend()
+        self.state.difficulty_level = recommendation["difficulty"]
+        return recommendation
+
+    def is_assessment_converged(self, question_count: int = None) -> bool:
+        if question_count is None and self.state:
+            question_count = self.state.question_count
+        if not self.state or question_count < Config.MIN_QUESTIONS:
+            return False
+        return self.ability.is_converged(Config.ABILITY_CONVERGED_VARIANCE)
+
+    def set_expected_concepts(self, concepts: List[str]) -> None:
+        if not self.state:
+            return
+        if not isinstance(concepts, list):
+            concepts = []
+        self.state.expected_concepts = [c for c in concepts if isinstance(c, str) and c.strip()]
 
     def add_topic(self, topic: str) -> None:
-        if self.state and topic not in self.state.topics_covered:
+        if not self.state:
+            return
+        self.state.current_topic = topic
+        if topic not in self.state.topics_covered:
             self.state.topics_covered.append(topic)
 
     def add_knowledge_gap(self, gap: str) -> None:
@@ -89,5 +144,6 @@ class StateManager:
             "avg_confidence": sum(self.state.confidence_scores) / len(self.state.confidence_scores)
             if self.state.confidence_scores else 0,
             "knowledge_gaps": self.state.knowledge_gaps,
-            "confirmed_skills": self.state.confirmed_skills
+            "confirmed_skills": self.state.confirmed_skills,
+            "ability_estimate": self.ability.summary()
         }
\ No newline at end of file
@@ -0,0 +1,179 @@
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Any, Iterator, Optional
+from config import Config
+from utils.profiler import profiler
+
+
+class Turn:
+    __slots__ = ("turn_id", "agent_visible_message", "user_message",
+                 "observer_thought", "interviewer_thought", "degradations")
+
+    def __init__(self, turn_id: int, agent_visible_message: str, user_message: str,
+                 observer_thought: str = "", interviewer_thought: str = "",
+                 degradations: List[str] = None):
+        self.turn_id = turn_id
+        self.agent_visible_message = agent_visible_message
+        self.user_message = user_message
+        self.observer_thought = observer_thought
+        self.interviewer_thought = interviewer_thought
+        self.degradations = degradations if degradations is not None else []
+
+    @property
+    def internal_thoughts(self) -> str:
+        return f"[Observer]: {self.observer_thought}\n[Interviewer]: {self.interviewer_thought}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "turn_id": self.turn_id,
+            "agent_visible_message": self.agent_visible_message,
+            "user_message": self.user_message,
+            "internal_thoughts": self.internal_thoughts,
+            "degradations": list(self.degradations)
+        }
+
+    def to_record(self) -> Dict[str, Any]:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "Turn":
+        return cls(**record)
+
+    def memory_size(self) -> int:
+        size = sys.getsizeof(self) + sys.getsizeof(self.degradations)
+        for value in (self.agent_visible_message, self.user_message,
+                      self.observer_thought, self.interviewer_thought, *self.degradations):
+            size += sys.getsizeof(value)
+        return size
+
+
+class TurnStore:
+    """The single copy of a session's turns, shared by state, logger and agents.
+
+    At most max_in_memory turns are kept in memory; older turns and, once the
+    session is closed, all turns are appended to a JSONL spill file and read
+    back from disk on demand.
+    """
+
+    def __init__(self, session_id: str, max_in_memory: int = None, spill_dir: str = None):
+        self.session_id = session_id
+        self.max_in_memory = max_in_memory or Config.TURN_STORE_MAX_IN_MEMORY
+        self.spill_path = Path(spill_dir or Config.TURN_STORE_SPILL_DIR) / f"{session_id}.jsonl"
+        self.opening_message = ""
+
+        self._turns: List[Turn] = []
+        self._spilled = 0
+        self._closed = False
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return self._spilled + len(self._turns)
+
+    def __iter__(self) -> Iterator[Turn]:
+        with self._lock:
+            in_memory = list(self._turns)
+            spilled = self._spilled
+        if spilled:
+            yield from self._read_spilled(spilled)
+        yield from in_memory
+
+    def append(self, turn: Turn) -> None:
+        with self._lock:
+            self._turns.append(turn)
+            if self._closed or len(self._turns) > self.max_in_memory:
+                self._spill(len(self._turns) if self._closed else len(self._turns) - self.max_in_memory)
+
+    def last(self) -> Optional[Turn]:
+        with self._lock:
+            if self._turns:
+                return self._turns[-1]
+        turns = list(self)
+        return turns[-1] if turns else None
+
+    def recent(self, count: int) -> List[Turn]:
+        with self._lock:
+            if count <= len(self._turns):
+                return self._turns[len(self._turns) - count:]
+        return list(self)[-count:]
+
+    def history(self, last: int = None) -> List[Dict[str, str]]:
+        """Question/answer pairs in the shape of the old conversation_history entries."""
+        turns = list(self) if last is None else self.recent(last + 1)
+        exchanges = []
+        previous = self.opening_message
+        if last is not None and len(turns) > last:
+            previous = turns.pop(0).agent_visible_message
+        for turn in turns:
+            exchanges.append({
+                "agent": previous,
+                "user": turn.user_message,
+                "internal_thoughts": turn.internal_thoughts
+            })
+            previous = turn.agent_visible_message
+        return exchanges
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return [turn.to_dict() for turn in self]
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            self._spill(len(self._turns))
+
+    def discard(self) -> None:
+        with self._lock:
+            self._turns = []
+            self._spilled = 0
+            if self.spill_path.exists():
+                self.spill_path.unlink()
+
+    @staticmethod
+    def remove_stale(spill_dir: str = None, max_age_hours: float = None) -> int:
+        """Deletes spill files left behind by sessions that were never released (e.g. a killed process)."""
+        directory = Path(spill_dir or Config.TURN_STORE_SPILL_DIR)
+        if not directory.is_dir():
+            return 0
+        cutoff = time.time() - 3600 * (max_age_hours if max_age_hours is not None
+                                       else Config.TURN_STORE_SPILL_MAX_AGE_HOURS)
+        removed = 0
+        for path in directory.glob("*.jsonl"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                continue
+        return removed
+
+    def memory_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            in_memory_bytes = sum(turn.memory_size() for turn in self._turns)
+            in_memory_bytes += sys.getsizeof(self.opening_message)
+            return {
+                "session_id": self.session_id,
+                "turns_total": len(self),
+                "turns_in_memory": len(self._turns),
+                "turns_spilled": self._spilled,
+                "in_memory_bytes": in_memory_bytes,
+                "spilled_bytes": self.spill_path.stat().st_size if self.spill_path.exists() else 0
+            }
+
+    def _spill(self, count: int) -> None:
+        if count <= 0:
+            return
+        self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+        with profiler.stage("turn_store_spill"), open(self.spill_path, 'a', encoding='utf-8') as f:
+            for turn in self._turns[:count]:
+                f.write(json.dumps(turn.to_record(), ensure_ascii=False) + "\n")
+        self._turns = self._turns[count:]
+        self._spilled += count
+
+    def _read_spilled(self, count: int) -> Iterator[Turn]:
+        with open(self.spill_path, 'r', encoding='utf-8') as f:
+            for i, line in enumerate(f):
+                if i >= count:
+                    break
+                yield Turn.from_record(json.loads(line))